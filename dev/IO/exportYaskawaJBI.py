@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Export d'un programme (importé puis éventuellement reconstruit) vers un fichier JBI.
+La table des positions C est régénérée dans l'ordre des poses du programme.
+"""
+import rhinoscriptsyntax as rs
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import jbiFrames
+import jbiParser
+import jbiWriter
+from poseTable import PoseTable, POSTYPES, BASE, ROBOT, USER
+from programRegistry import get_registry
+from rebuildPrograms import get_program_from_selection
+
+def get_program_pose_ids(prog_id):
+    """Parcourt les courbes du programme ; les poses de transition ne sont gardées qu'une fois."""
+    registry = get_registry()
+    return [p_uuid for p_uuid in registry.program_poses(prog_id) if p_uuid in registry.poses]
+
+def local_pose(pose_id, user_frames):
+    """
+    Pose exprimée dans son repère d'origine (///POSTYPE) : (postype, n° USER, x..Rz).
+    BASE / ROBOT : repère monde ; USER : inverse du repère utilisé à l'import.
+    """
+    name = rs.ObjectName(pose_id)
+    postype = rs.GetUserText(pose_id, "PosType")
+    if postype not in POSTYPES:
+        raise jbiWriter.JbiWriteError("Pose {} : repère (///POSTYPE) inconnu.".format(name))
+    postype = POSTYPES.index(postype)
+    xform = rs.BlockInstanceXform(pose_id)
+    m = [[xform[r, c] for c in range(4)] for r in range(4)]
+    user = 0
+    if postype == USER:
+        user = int(rs.GetUserText(pose_id, "User"))
+        if user not in user_frames:
+            raise jbiWriter.JbiWriteError("Pose {} : repère USER {} inconnu.".format(name, user))
+        m = jbiFrames.mat_mul(jbiFrames.rigid_inverse(user_frames[user]), m)
+    elif postype not in (BASE, ROBOT):
+        raise jbiWriter.JbiWriteError("Pose {} : position {} non réexportable.".format(name, POSTYPES[postype]))
+    return postype, user, jbiFrames.matrix_to_pose(m)
+
+def pose_to_move(pose_id, index, program, bc_numbers, user_frames):
+    """
+    Lit une instance Pose (repère + UserText) et l'ajoute au programme.
+    Les positions BC sont renumérotées dans l'ordre d'apparition (bc_numbers : ancien id -> n°).
+    """
+    postype, user, pose = local_pose(pose_id, user_frames)
+    tool = rs.GetUserText(pose_id, "Tool")
+    if tool is None:
+        raise jbiWriter.JbiWriteError("Pose {} : outil (///TOOL) inconnu.".format(rs.ObjectName(pose_id)))
+    row = program.positions.append(pose, c_id=index, postype=postype, user=user,
+                                   tool=int(tool), rconf=rs.GetUserText(pose_id, "RCONF"))
+
+    bc_id = rs.GetUserText(pose_id, "BC")
+    if bc_id:
+        if bc_id not in bc_numbers:
+            bc_pos = rs.GetUserText(pose_id, "BC_Pos")
+            if not bc_pos:
+                raise jbiWriter.JbiWriteError("Pose {} : position {} inconnue.".format(rs.ObjectName(pose_id), bc_id))
+            bc_numbers[bc_id] = len(bc_numbers)
+            bc_ctx = rs.GetUserText(pose_id, "BC_Ctx")
+            program.bc_positions[bc_numbers[bc_id]] = (bc_pos, tuple(bc_ctx.split("|")) if bc_ctx else ())
+        bc_id = "BC{:05d}".format(bc_numbers[bc_id])
+
+    speed_type = "VJ" if rs.GetUserText(pose_id, "VJ") else "V"
+    return jbiParser.JbiMove(
+        index,
+        rs.GetUserText(pose_id, "Type") or "MOVL",
+        "C{:05d}".format(index),
+        bc_id,
+        speed_type,
+        rs.GetUserText(pose_id, speed_type),
+        rs.GetUserText(pose_id, "PL"),
+        rs.GetUserText(pose_id, "Comment"),
+        rs.GetUserText(pose_id, "State") == "ARCON",
+        row,
+        rs.GetUserText(pose_id, "ArcCmd"))
+
+def build_program(prog_id):
+    """JbiProgram reconstruit depuis le document ; JbiWriteError si une donnée d'origine manque."""
+    program = jbiParser.JbiProgram()
+    b_name = rs.BlockInstanceName(prog_id)
+    program.job_name = b_name[5:] if b_name.startswith("PROG_") else b_name
+    parent = rs.ParentLayer(rs.ObjectLayer(prog_id))
+    if parent: program.folder_name = parent.split("::")[-1]
+
+    unsupported = rs.GetUserText(prog_id, "Unsupported")
+    if unsupported:
+        raise jbiWriter.JbiWriteError("positions {} non gérées à l'import.".format(unsupported))
+    groups = rs.GetUserText(prog_id, "Groups")
+    if groups: program.groups = groups.split("|")
+    program.trailing_arc = rs.GetUserText(prog_id, "ArcEnd")
+
+    frames = rs.GetUserText(prog_id, "UserFrames")
+    user_frames = dict((int(n), m) for n, m in json.loads(frames).items()) if frames else {}
+
+    program.positions = PoseTable()
+    bc_numbers = {}
+    program.moves = [pose_to_move(p_id, i, program, bc_numbers, user_frames)
+                     for i, p_id in enumerate(get_program_pose_ids(prog_id))]
+    return program
+
+def export_jbi():
+    selected = rs.SelectedObjects()
+    if selected:
+        target_programs = get_program_from_selection(selected)
+    else:
+        registry = get_registry()
+        all_progs = registry.program_ids()
+        if not all_progs: return
+        picked = rs.MultiListBox([registry.program_layer(p) for p in all_progs], "Programmes à exporter", "Export JBI")
+        if not picked: return
+        target_programs = [p for p in all_progs if registry.program_layer(p) in picked]
+    if not target_programs:
+        print("Selection invalide: Selectionnez un element du programme.")
+        return
+
+    for prog_id in target_programs:
+        try:
+            program = build_program(prog_id)
+        except jbiWriter.JbiWriteError as e:
+            print("Export refusé ({}) : {}".format(rs.BlockInstanceName(prog_id), e))
+            continue
+        filepath = rs.SaveFileName("Exporter " + program.job_name, "JBI Files (*.jbi)|*.jbi||", None, program.job_name + ".JBI")
+        if not filepath: continue
+        try:
+            jbiWriter.write_jbi(program, filepath)
+        except jbiWriter.JbiWriteError as e:
+            print("Export refusé ({}) : {}".format(program.job_name, e))
+            continue
+        print("Exporté : {} ({} poses)".format(filepath, len(program.moves)))
+
+if __name__ == "__main__":
+    export_jbi()
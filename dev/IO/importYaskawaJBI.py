@@ -1,6 +1,25 @@
+# -*- coding: utf-8 -*-
 import rhinoscriptsyntax as rs
+import Rhino
 import Rhino.Geometry as rg
-import re
+import scriptcontext as sc
+import System.Drawing
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
+import jbiCache
+import jbiFrames
+import jbiSource
+import jbiSync
+import programTopology
+from poseTable import PoseTable, ARCON, ARCOF, USER, POSTYPES, c_number
+
+# Modèle cinématique optionnel pour les positions PULSE (voir jbiFrames.KinematicModel)
+KINEMATICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kinematics.json")
 
 def create_pose_block():
     if rs.IsBlock("Pose"): return
@@ -26,27 +45,338 @@ def create_start_end_blocks():
         rs.AddBlock([sph], [0,0,0], "End", True)
     rs.CurrentLayer(current_lyr)
 
-def import_jbi_final():
-    filepath = rs.OpenFileName("Ouvrir fichier JBI", "JBI Files (*.jbi)|*.jbi||")
-    if not filepath: return
-    
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-
-    job_name = "NONAME"
-    folder_name = ""
-    pos_dict = {}
-
-    # Lecture des définitions (Header)
-    for line in lines:
-        l = line.strip()
-        if l.startswith("//NAME"): job_name = l.split(" ")[1]
-        elif l.startswith("///FOLDERNAME"): folder_name = l.split(" ")[1]
-        elif l.startswith("C") and "=" in l:
-            parts = l.split("=")
-            try:
-                pos_dict[parts[0]] = [float(v) for v in parts[1].split(",")]
-            except: pass
+# Clés de pose réécrites à chaque synchronisation (absentes si le mouvement ne les porte pas)
+OPTIONAL_POSE_KEYS = ("BC", "BC_Pos", "BC_Ctx", "V", "VJ", "PL", "Comment", "User", "RCONF", "ArcCmd")
+
+def position_context(mv, program):
+    """Repère d'origine (POSTYPE, USER), outil, configuration du bras et position BC, relus à l'export."""
+    positions = program.positions
+    postype = positions.postype[mv.pos_row]
+    items = [("PosType", POSTYPES[postype])]
+    if postype == USER: items.append(("User", str(positions.user[mv.pos_row])))
+    items.append(("Tool", str(positions.tool[mv.pos_row])))
+    if positions.rconf[mv.pos_row]: items.append(("RCONF", positions.rconf[mv.pos_row]))
+    if mv.bc_id:
+        bc = program.bc_positions.get(int(mv.bc_id[2:]))
+        if bc:
+            items.append(("BC_Pos", bc[0]))
+            items.append(("BC_Ctx", "|".join(bc[1])))
+    return items
+
+def pose_user_strings(mv, pose, program):
+    """Liste ordonnée des UserText (clé, valeur) d'une pose, hors uuid_origin."""
+    context = position_context(mv, program)
+    items = [("ID_C", mv.c_id)]
+    if mv.bc_id: items.append(("BC", mv.bc_id))
+    items.append(("Type", mv.move_type))
+    if mv.speed: items.append((mv.speed_type, mv.speed))
+    if mv.pl: items.append(("PL", mv.pl))
+    if mv.comment: items.append(("Comment", mv.comment))
+    items.extend(context)
+    # Instruction ARCON/ARCOF d'origine (arguments compris) qui précède le mouvement
+    if mv.arc_cmd: items.append(("ArcCmd", mv.arc_cmd))
+    # STOCKAGE DE L'ÉTAT ACTUEL
+    items.append(("State", "ARCON" if mv.arcon else "ARCOF"))
+    # Empreinte du mouvement pour la resynchronisation
+    items.append(("Hash", jbiSync.move_hash(mv, pose, [v for k, v in context])))
+    return items
+
+def set_program_header(attr_set, program, user_frames=None):
+    """
+    En-tête du job non porté par les poses (groupes d'axes, ARCOF final, positions non gérées)
+    et repères USER utilisés à l'import, pour réexprimer les poses dans leur repère d'origine.
+    """
+    frames = dict((str(n), (user_frames or {}).get(n, jbiFrames.IDENTITY)) for n in used_user_frames(program))
+    attr_set("UserFrames", json.dumps(frames, separators=(",", ":")) if frames else None)
+    attr_set("Groups", "|".join(program.groups) or None)
+    attr_set("ArcEnd", program.trailing_arc)
+    attr_set("Unsupported", ",".join(program.unsupported) or None)
+
+def new_attributes(layer_index, name):
+    """Attributs préparés avec un identifiant réservé (connu avant l'ajout)."""
+    attr = Rhino.DocObjects.ObjectAttributes()
+    attr.LayerIndex = layer_index
+    attr.Name = name
+    attr.ObjectId = System.Guid.NewGuid()
+    return attr
+
+def commit_object_id(obj_id, attr):
+    """Si l'identifiant réservé était déjà pris, on corrige uuid_origin."""
+    if obj_id != attr.ObjectId and obj_id != System.Guid.Empty:
+        rs.SetUserText(obj_id, "uuid_origin", str(obj_id))
+    return obj_id
+
+def load_kinematics():
+    if not os.path.isfile(KINEMATICS_FILE): return None
+    return jbiFrames.KinematicModel.load(KINEMATICS_FILE)
+
+def used_user_frames(program):
+    positions = program.positions
+    return set(positions.user[r] for r in range(len(positions)) if positions.postype[r] == USER)
+
+# Section de la table de chaînes du document : repères USER choisis (16 valeurs par repère)
+USER_FRAMES_SECTION = "picksoul_user_frames"
+
+def stored_user_frames(doc):
+    frames = {}
+    for key in doc.Strings.GetEntryNames(USER_FRAMES_SECTION) or []:
+        values = [float(v) for v in doc.Strings.GetValue(USER_FRAMES_SECTION, key).split(",")]
+        frames[int(key)] = [values[r * 4:r * 4 + 4] for r in range(4)]
+    return frames
+
+def ask_user_frames(numbers, doc=None):
+    """
+    Repères utilisateur (USER n) : une Pose du document sert de repère.
+    Les choix sont mémorisés dans le document ; ils peuvent être repris ou oubliés.
+    """
+    doc = doc or sc.doc
+    frames = stored_user_frames(doc)
+    known = sorted(n for n in numbers if n in frames)
+    if known:
+        msg = "Repères USER mémorisés ({})".format(", ".join(str(n) for n in known))
+        choice = rs.GetString(msg, "Conserver", ["Conserver", "Reprendre", "Reinitialiser"])
+        if choice == "Reinitialiser":
+            for n in frames: doc.Strings.Delete(USER_FRAMES_SECTION, str(n))
+            frames = {}
+        elif choice == "Reprendre":
+            for n in known: del frames[n]
+    for n in sorted(numbers):
+        if n in frames: continue
+        ref_id = rs.GetObject("Repère USER {} : sélectionnez une Pose (Entrée = Monde)".format(n), rs.filter.instance)
+        if ref_id:
+            xform = rs.BlockInstanceXform(ref_id)
+            frames[n] = [[xform[r, c] for c in range(4)] for r in range(4)]
+        else:
+            frames[n] = jbiFrames.IDENTITY
+        doc.Strings.SetString(USER_FRAMES_SECTION, str(n), ",".join(repr(float(v)) for row in frames[n] for v in row))
+    return dict((n, frames[n]) for n in numbers)
+
+def resolve_moves(program, user_frames=None):
+    """
+    Convertit toute la table des positions en repères monde (un seul lot) et
+    renvoie [(mouvement, matrice 4x4, pose monde)] ; les mouvements dont la
+    position n'est pas convertible (TOOL, PULSE sans modèle) sont écartés.
+    """
+    matrices = jbiFrames.pose_matrices(program.positions, user_frames=user_frames, kinematics=load_kinematics())
+    resolved = []
+    skipped = {}
+    pending_arc = None
+    for mv in program.moves:
+        m = matrices[mv.pos_row]
+        if m is None:
+            postype = POSTYPES[program.positions.postype[mv.pos_row]]
+            skipped[postype] = skipped.get(postype, 0) + 1
+            # L'instruction ARCON/ARCOF d'un mouvement écarté passe au suivant
+            if mv.arc_cmd: pending_arc = mv.arc_cmd
+            continue
+        if pending_arc and not mv.arc_cmd: mv = mv._replace(arc_cmd=pending_arc)
+        pending_arc = None
+        resolved.append((mv._replace(index=len(resolved)), m, jbiFrames.matrix_to_pose(m)))
+    for postype, count in skipped.items():
+        print("{} : {} mouvement(s) {} ignoré(s) (position non convertible).".format(program.job_name, count, postype))
+    return resolved
+
+def pose_xform(matrix):
+    """Matrice 4x4 -> Transform : la Pose porte l'orientation complète."""
+    xform = rg.Transform(1.0)
+    for r in range(4):
+        for c in range(4): xform[r, c] = matrix[r][c]
+    return xform
+
+# --- MODE rhinoscriptsyntax (pose par pose) ---
+
+def add_poses_rs(resolved, main_lyr, program):
+    poses = PoseTable()
+    rs.CurrentLayer(main_lyr)
+    for mv, m, p in resolved:
+        inst_id = rs.InsertBlock2("Pose", pose_xform(m))
+        rs.ObjectName(inst_id, "{:04d}".format(mv.index))
+
+        # UserText
+        rs.SetUserText(inst_id, "uuid_origin", str(inst_id))
+        for key, val in pose_user_strings(mv, p, program): rs.SetUserText(inst_id, key, val)
+
+        poses.append(p, c_number(mv.c_id), ARCON if mv.arcon else ARCOF, str(inst_id))
+    return poses
+
+def add_trajectory_rs(poses, start, end, state, traj_lyr):
+    rs.CurrentLayer(traj_lyr)
+    pid = rs.AddPolyline(poses.points(start, end))
+    rs.ObjectName(pid, programTopology.trajectory_name(start, end, state))
+    rs.ObjectColor(pid, programTopology.trajectory_color(state))
+    rs.SetUserText(pid, "uuid_origin", str(pid))
+    rs.SetUserText(pid, programTopology.TOPOLOGY_KEY, programTopology.encode_curve(start, poses.uuid[start:end + 1]))
+    return str(pid)
+
+# --- MODE RhinoCommon (attributs construits une fois, ajout direct à la table) ---
+
+def add_poses_bulk(resolved, main_lyr, program):
+    idef = sc.doc.InstanceDefinitions.Find("Pose")
+    layer_index = sc.doc.Layers.FindByFullPath(main_lyr, -1)
+    table = sc.doc.Objects
+    poses = PoseTable()
+    for mv, m, p in resolved:
+        attr = new_attributes(layer_index, "{:04d}".format(mv.index))
+        attr.SetUserString("uuid_origin", str(attr.ObjectId))
+        for key, val in pose_user_strings(mv, p, program): attr.SetUserString(key, val)
+
+        inst_id = commit_object_id(table.AddInstanceObject(idef.Index, pose_xform(m), attr), attr)
+        poses.append(p, c_number(mv.c_id), ARCON if mv.arcon else ARCOF, str(inst_id))
+    return poses
+
+def add_trajectory_bulk(poses, start, end, state, traj_lyr):
+    layer_index = sc.doc.Layers.FindByFullPath(traj_lyr, -1)
+    attr = new_attributes(layer_index, programTopology.trajectory_name(start, end, state))
+    attr.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+    attr.ObjectColor = System.Drawing.Color.FromArgb(*programTopology.trajectory_color(state))
+    attr.SetUserString("uuid_origin", str(attr.ObjectId))
+    attr.SetUserString(programTopology.TOPOLOGY_KEY, programTopology.encode_curve(start, poses.uuid[start:end + 1]))
+    pts = [rg.Point3d(*pt) for pt in poses.points(start, end)]
+    pid = sc.doc.Objects.AddPolyline(pts, attr)
+    return str(commit_object_id(pid, attr))
+
+def build_trajectories(poses, add_trajectory, traj_lyr):
+    """Découpe les poses en segments ARCON/ARCOF et crée une polyligne par segment."""
+    created_crv_uuids = []
+    for start, end, state in poses.state_runs():
+        if end > start:
+            created_crv_uuids.append(add_trajectory(poses, start, end, state, traj_lyr))
+    return created_crv_uuids
+
+# --- RESYNCHRONISATION (programme déjà importé) ---
+
+def find_program_instance(b_name):
+    if not rs.IsBlock(b_name): return None
+    for inst in rs.BlockInstances(b_name) or []:
+        if rs.GetUserText(inst, "type") == "program": return inst
+    return None
+
+def read_program_curves(prog_obj):
+    """Courbes du programme avec la liste des uuids de leurs poses."""
+    curves = []
+    for u in programTopology.program_curves(prog_obj.Attributes.GetUserString):
+        crv = sc.doc.Objects.FindId(System.Guid(u))
+        if not crv: continue
+        attr = crv.Attributes
+        first, pose_uuids = programTopology.curve_topology(attr.GetUserString)
+        state = ARCON if (attr.Name or "").startswith("ARCON") else ARCOF
+        curves.append(jbiSync.ExistingCurve(u, state, pose_uuids, first))
+    return curves
+
+def read_program_poses(main_lyr):
+    """Poses existantes du calque programme, dans l'ordre de leur numéro."""
+    layer = sc.doc.Layers[sc.doc.Layers.FindByFullPath(main_lyr, -1)]
+    existing = []
+    for obj in sc.doc.Objects.FindByLayer(layer) or []:
+        if not isinstance(obj, Rhino.DocObjects.InstanceObject): continue
+        if obj.InstanceDefinition.Name != "Pose": continue
+        attr = obj.Attributes
+        name = attr.Name or ""
+        index = int(name) if name.isdigit() else -1
+        existing.append(jbiSync.ExistingPose(str(obj.Id), attr.GetUserString("ID_C"), attr.GetUserString("Hash"), index))
+    existing.sort(key=lambda e: e.index)
+    return existing
+
+def sync_program(program, filepath, prog_inst, user_frames=None):
+    """
+    Met à jour un programme existant : seules les poses et trajectoires
+    réellement modifiées sont ajoutées, déplacées, renumérotées ou supprimées.
+    """
+    table = sc.doc.Objects
+    prog_obj = table.FindId(prog_inst)
+    main_lyr = rs.ObjectLayer(prog_inst)
+    traj_lyr = main_lyr + "::trajs_arcon_arcof"
+    if not rs.IsLayer(traj_lyr): rs.AddLayer("trajs_arcon_arcof", parent=main_lyr)
+    layer_index = sc.doc.Layers.FindByFullPath(main_lyr, -1)
+    idef = sc.doc.InstanceDefinitions.Find("Pose")
+
+    resolved = resolve_moves(program, user_frames)
+    moves = [r[0] for r in resolved]
+    matrices = [r[1] for r in resolved]
+    world = [r[2] for r in resolved]
+    hashes = [jbiSync.move_hash(mv, p, [v for k, v in position_context(mv, program)]) for mv, p in zip(moves, world)]
+    plan = jbiSync.plan_sync(read_program_poses(main_lyr), moves, hashes)
+
+    # --- 1. POSES ---
+    for u in plan.to_delete: table.Delete(System.Guid(u), True)
+
+    uuids = list(plan.targets)
+    for i in plan.to_add:
+        mv, p = moves[i], world[i]
+        attr = new_attributes(layer_index, "{:04d}".format(i))
+        attr.SetUserString("uuid_origin", str(attr.ObjectId))
+        for key, val in pose_user_strings(mv, p, program): attr.SetUserString(key, val)
+        uuids[i] = str(commit_object_id(table.AddInstanceObject(idef.Index, pose_xform(matrices[i]), attr), attr))
+
+    for i in plan.to_update:
+        obj = table.FindId(System.Guid(uuids[i]))
+        ok, inv = obj.InstanceXform.TryGetInverse()
+        if ok: table.Transform(obj.Id, pose_xform(matrices[i]) * inv, True)
+        attr = obj.Attributes.Duplicate()
+        attr.Name = "{:04d}".format(i)
+        for key in OPTIONAL_POSE_KEYS: attr.DeleteUserString(key)
+        for key, val in pose_user_strings(moves[i], world[i], program): attr.SetUserString(key, val)
+        table.ModifyAttributes(obj.Id, attr, True)
+
+    for i in plan.to_rename:
+        obj = table.FindId(System.Guid(uuids[i]))
+        attr = obj.Attributes.Duplicate()
+        attr.Name = "{:04d}".format(i)
+        table.ModifyAttributes(obj.Id, attr, True)
+
+    poses = PoseTable()
+    for mv, p, u in zip(moves, world, uuids):
+        poses.append(p, c_number(mv.c_id), ARCON if mv.arcon else ARCOF, u)
+
+    # --- 2. TRAJECTOIRES ---
+    runs = [r for r in poses.state_runs() if r[1] > r[0]]
+    dirty_rows = set(plan.to_add) | set(plan.to_update)
+    crv_plan = jbiSync.plan_curves(read_program_curves(prog_obj), runs, poses.uuid, dirty_rows)
+
+    for u in crv_plan.to_delete: table.Delete(System.Guid(u), True)
+    crv_uuids = list(crv_plan.keep)
+    for k in crv_plan.to_create:
+        start, end, state = runs[k]
+        crv_uuids[k] = add_trajectory_bulk(poses, start, end, state, traj_lyr)
+    for k in crv_plan.to_renumber:
+        start, end, state = runs[k]
+        crv = table.FindId(System.Guid(crv_uuids[k]))
+        attr = crv.Attributes.Duplicate()
+        attr.Name = programTopology.trajectory_name(start, end, state)
+        programTopology.set_topology(attr, programTopology.encode_curve(start, poses.uuid[start:end + 1]))
+        table.ModifyAttributes(crv.Id, attr, True)
+
+    # --- 3. START / END ---
+    if len(poses):
+        ends = {"Start": poses.point(0), "End": poses.point(len(poses) - 1)}
+        for obj in sc.doc.Objects.FindByLayer(sc.doc.Layers[layer_index]) or []:
+            if not isinstance(obj, Rhino.DocObjects.InstanceObject): continue
+            target = ends.get(obj.InstanceDefinition.Name)
+            if target is None: continue
+            move = rg.Point3d(*target) - obj.InsertionPoint
+            if not move.IsTiny(): table.Transform(obj.Id, rg.Transform.Translation(move), True)
+
+    # --- 4. PROGRAMME (topologie + source) ---
+    attr = prog_obj.Attributes.Duplicate()
+    programTopology.set_topology(attr, programTopology.encode_program(crv_uuids))
+    set_program_header(lambda k, v: attr.SetUserString(k, v) if v else attr.DeleteUserString(k), program, user_frames)
+    table.ModifyAttributes(prog_obj.Id, attr, True)
+    b_name = rs.BlockInstanceName(prog_inst)
+    sc.doc.Strings.SetString(jbiSource.SOURCE_SECTION, b_name, jbiSource.compress_file(filepath))
+
+    print("Synchronisation {} : {} ajoutées, {} modifiées, {} renumérotées, {} supprimées, {} trajectoires recréées.".format(
+        program.job_name, len(plan.to_add), len(plan.to_update), len(plan.to_rename), len(plan.to_delete), len(crv_plan.to_create)))
+    return prog_inst
+
+def import_program(program, filepath, bulk=True, user_frames=None):
+    """
+    Crée dans le document un programme déjà parsé (calques, poses, trajectoires,
+    bloc programme). Renvoie l'instance du bloc programme.
+    bulk=True : poses et trajectoires ajoutées directement à la table d'objets.
+    bulk=False : ancien chemin rhinoscriptsyntax, pose par pose.
+    """
+    job_name = program.job_name
+    folder_name = program.folder_name
 
     # Création Calques
     if folder_name:
@@ -54,112 +384,74 @@ def import_jbi_final():
         main_lyr = rs.AddLayer(job_name, parent=folder_name)
     else:
         main_lyr = rs.AddLayer(job_name)
-    
+
     traj_lyr = rs.AddLayer("trajs_arcon_arcof", parent=main_lyr)
-    
+
     create_pose_block()
     create_start_end_blocks()
-    rs.EnableRedraw(False)
-    
-    origin_plane = rs.WorldXYPlane()
-    inst_data = []
-    
-    # ETAT PAR DEFAUT = ARCOF (False)
-    ctx = {'arcon': False} 
-    in_nop = False
-    idx = 0
-
-    # Regex capture : Type, C_ID, BC_ID(opt), V_Type(opt), V_Val(opt), PL(opt), Comment(opt)
-    pattern = r"(MOVL|MOVJ|SMOVL)\s+(C\d+)(?:\s+(BC\d+))?(?:\s+(V|VJ)=([\d\.]+))?(?:\s+PL=(\d+))?(?:.*//(.*))?"
-
-    for line in lines:
-        raw = line.strip()
-        if raw == "NOP": in_nop = True; continue
-        if not in_nop or raw == "END": continue
-        
-        # 1. Mise à jour de l'état AVANT de traiter la pose courante
-        if "ARCON" in raw: ctx['arcon'] = True
-        elif "ARCOF" in raw: ctx['arcon'] = False
-        
-        m = re.search(pattern, raw)
-        if m:
-            m_type, c_id, bc_id, v_type, v_val, pl_val, comment = m.groups()
-            
-            if c_id in pos_dict:
-                p = pos_dict[c_id]
-                pt = origin_plane.PointAt(p[0], p[1], p[2])
-                rs.CurrentLayer(main_lyr)
-                inst_id = rs.InsertBlock("Pose", pt)
-                rs.ObjectName(inst_id, "{:04d}".format(idx))
-                
-                # UserText
-                rs.SetUserText(inst_id, "uuid_origin", str(inst_id))
-                rs.SetUserText(inst_id, "ID_C", c_id)
-                if bc_id: rs.SetUserText(inst_id, "BC", bc_id)
-                rs.SetUserText(inst_id, "Type", m_type)
-                if v_val: rs.SetUserText(inst_id, v_type, v_val)
-                if pl_val: rs.SetUserText(inst_id, "PL", pl_val)
-                if comment: rs.SetUserText(inst_id, "Comment", comment.strip())
-                
-                # STOCKAGE DE L'ÉTAT ACTUEL
-                current_state = "ARCON" if ctx['arcon'] else "ARCOF"
-                rs.SetUserText(inst_id, "State", current_state)
-                
-                inst_data.append({'idx': str(idx), 'pos': pt, 'arcon': ctx['arcon'], 'uuid': str(inst_id)})
-                idx += 1
-
-    # Création des Trajectoires
-    rs.CurrentLayer(traj_lyr)
-    created_crv_uuids = []
-    
-    if len(inst_data) > 1:
-        def build_t(data, state):
-            if len(data) < 2: return
-            pid = rs.AddPolyline([d['pos'] for d in data])
-            pref = "ARCON" if state else "ARCOF"
-            rs.ObjectName(pid, "{} {}-{}".format(pref, data[0]['idx'], data[-1]['idx']))
-            rs.ObjectColor(pid, (255,0,0) if state else (150,150,150))
-            rs.SetUserText(pid, "uuid_origin", str(pid))
-            for i, d in enumerate(data):
-                rs.SetUserText(pid, "Pt_{:04d}".format(i), "{:04d}".format(int(d['idx'])))
-                rs.SetUserText(pid, "UUID_{:04d}".format(i), d['uuid'])
-            created_crv_uuids.append(str(pid))
-
-        seg = [inst_data[0]]
-        last_s = inst_data[0]['arcon']
-        for i in range(1, len(inst_data)):
-            if inst_data[i]['arcon'] != last_s:
-                build_t(seg, last_s)
-                seg = [inst_data[i-1], inst_data[i]]
-                last_s = inst_data[i]['arcon']
-            else: seg.append(inst_data[i])
-        build_t(seg, last_s)
+
+    resolved = resolve_moves(program, user_frames)
+    if bulk:
+        poses = add_poses_bulk(resolved, main_lyr, program)
+        created_crv_uuids = build_trajectories(poses, add_trajectory_bulk, traj_lyr)
+    else:
+        poses = add_poses_rs(resolved, main_lyr, program)
+        created_crv_uuids = build_trajectories(poses, add_trajectory_rs, traj_lyr)
 
     # Start/End
-    if inst_data:
+    if len(poses):
         rs.CurrentLayer(main_lyr)
-        rs.InsertBlock("Start", inst_data[0]['pos'])
-        rs.InsertBlock("End", inst_data[-1]['pos'])
+        rs.InsertBlock("Start", poses.point(0))
+        rs.InsertBlock("End", poses.point(len(poses) - 1))
 
-    # Bloc Program (Restoration du texte complet)
+    # Bloc Program : simple repère, le source JBI est stocké compressé
+    # dans la table de chaînes du document (voir showJbiSource.py)
     def_lyr = "_program_def"
     if not rs.IsLayer(def_lyr): rs.AddLayer(def_lyr)
     rs.CurrentLayer(def_lyr)
-    
-    full_text = "".join(lines) # Texte complet
-    txt_id = rs.AddText(full_text, [0,0,0], 2.0)
-    
+
     b_name = "PROG_" + job_name
+    dot_id = rs.AddTextDot(b_name, [0,0,0])
+
     if rs.IsBlock(b_name): rs.DeleteBlock(b_name)
-    rs.AddBlock([txt_id], [0,0,0], b_name, True)
-    
+    rs.AddBlock([dot_id], [0,0,0], b_name, True)
+    sc.doc.Strings.SetString(jbiSource.SOURCE_SECTION, b_name, jbiSource.compress_file(filepath))
+
     rs.CurrentLayer(main_lyr)
     prog_inst = rs.InsertBlock(b_name, [0,0,0])
     rs.SetUserText(prog_inst, "type", "program")
+    rs.SetUserText(prog_inst, jbiSource.SOURCE_KEY, b_name)
     # On stocke l'ordre des courbes pour le rebuild
-    for i, u in enumerate(created_crv_uuids): rs.SetUserText(prog_inst, "Crv_{:04d}".format(i), u)
+    rs.SetUserText(prog_inst, programTopology.TOPOLOGY_KEY, programTopology.encode_program(created_crv_uuids))
+    set_program_header(lambda k, v: rs.SetUserText(prog_inst, k, v), program, user_frames)
+    return prog_inst
+
+def import_jbi_final(bulk=True):
+    """
+    Importe un fichier JBI : un seul enregistrement d'annulation
+    et un seul rafraîchissement pour tout l'import.
+    """
+    filepath = rs.OpenFileName("Ouvrir fichier JBI", "JBI Files (*.jbi)|*.jbi||")
+    if not filepath: return
+
+    with CommandScope("Import JBI " + os.path.basename(filepath), verbose=True) as scope:
+        # Lecture en une seule passe (en-tête + positions + mouvements)
+        scope.phase("lecture")
+        program = jbiCache.parse_jbi_file(filepath)
+
+        # Programme déjà présent : resynchronisation incrémentale ou nouvel import
+        prog_inst = find_program_instance("PROG_" + program.job_name)
+        mode = "Nouveau"
+        with scope.interactive():
+            if prog_inst:
+                msg = "Le programme {} existe déjà.".format(program.job_name)
+                mode = rs.GetString(msg, "Synchroniser", ["Synchroniser", "Nouveau"])
+                if not mode: return
+            user_frames = ask_user_frames(used_user_frames(program))
 
-    rs.EnableRedraw(True)
+        scope.phase(mode.lower())
+        if mode == "Synchroniser": sync_program(program, filepath, prog_inst, user_frames)
+        else: import_program(program, filepath, bulk, user_frames)
 
 if __name__ == "__main__":
     import_jbi_final()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Import de tous les fichiers JBI d'un dossier.
+Le parsing est fait en parallèle, la création des objets reste séquentielle.
+"""
+import rhinoscriptsyntax as rs
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
+import jbiParser
+import importYaskawaJBI
+
+def import_jbi_folder(bulk=True):
+    folder = rs.BrowseForFolder(rs.DocumentPath(), "Dossier des programmes JBI", "Import JBI")
+    if not folder: return
+
+    paths = sorted([os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".jbi")])
+    if not paths:
+        print("Aucun fichier JBI dans : {}".format(folder))
+        return
+
+    with CommandScope("Import dossier JBI", verbose=True) as scope:
+        # --- 1. PARSING PARALLELE (pur Python) ---
+        print("Lecture de {} fichiers JBI...".format(len(paths)))
+        scope.phase("lecture")
+        results = jbiParser.parse_jbi_files(paths, use_cache=True)
+
+        # Repères USER demandés une seule fois pour l'ensemble des fichiers
+        user_numbers = set()
+        for res in results:
+            if not res.error: user_numbers |= importYaskawaJBI.used_user_frames(res.program)
+        with scope.interactive():
+            user_frames = importYaskawaJBI.ask_user_frames(user_numbers)
+
+        # --- 2. CREATION SEQUENTIELLE DANS LE DOCUMENT ---
+        scope.phase("création")
+        imported = 0
+        for res in results:
+            file_name = os.path.basename(res.path)
+            if res.error:
+                print("ERREUR {} : {}".format(file_name, res.error))
+                continue
+            t1 = time.time()
+            importYaskawaJBI.import_program(res.program, res.path, bulk, user_frames)
+            imported += 1
+            print("{} : {} poses | lecture {:.3f} s | création {:.3f} s".format(
+                file_name, len(res.program), res.seconds, time.time() - t1))
+
+    print("{}/{} programmes importés.".format(imported, len(paths)))
+
+if __name__ == "__main__":
+    import_jbi_folder()
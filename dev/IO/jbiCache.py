@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Cache disque des JBI parsés, indépendant de Rhino.
+
+Clé = SHA-1 du contenu du fichier + version du parseur : un même fichier
+(même renommé ou déplacé) n'est parsé qu'une fois. Chaque entrée est un pickle
+du JbiProgram (en-tête, table des positions, mouvements). La date de
+modification d'une entrée sert de date de dernier accès pour l'éviction LRU.
+"""
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import jbiParser
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_jbi_cache")
+MAX_BYTES = 256 * 1024 * 1024
+MAX_ENTRIES = 512
+CHUNK_SIZE = 1 << 16
+EXTENSION = ".pkl"
+
+
+def file_key(filepath):
+    """SHA-1 du contenu (lu par blocs) + version du parseur."""
+    sha = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk: break
+            sha.update(chunk)
+    return "{}_v{}".format(sha.hexdigest(), jbiParser.PARSER_VERSION)
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + EXTENSION)
+
+
+def load(key, cache_dir=CACHE_DIR):
+    """Programme en cache ou None. Un accès rafraîchit la date de l'entrée."""
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, 'rb') as f:
+            program = pickle.load(f)
+        os.utime(path, None)
+        return program
+    except (IOError, OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def store(key, program, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, max_entries=MAX_ENTRIES):
+    """Écrit l'entrée (fichier temporaire puis renommage) et applique l'éviction."""
+    if not os.path.isdir(cache_dir):
+        try: os.makedirs(cache_dir)
+        except OSError: pass
+    path = _entry_path(key, cache_dir)
+    tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.current_thread().ident)
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(program, f, pickle.HIGHEST_PROTOCOL)
+        if os.path.exists(path): os.remove(path)
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        if os.path.exists(tmp): os.remove(tmp)
+        return
+    evict(cache_dir, max_bytes, max_entries)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, max_entries=MAX_ENTRIES):
+    """Supprime les entrées les moins récemment utilisées au-delà des limites."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(EXTENSION): continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError: continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+
+    total = sum(e[1] for e in entries)
+    count = len(entries)
+    for mtime, size, path in entries:
+        if total <= max_bytes and count <= max_entries: break
+        try:
+            os.remove(path)
+        except OSError: continue
+        total -= size
+        count -= 1
+
+
+def clear(cache_dir=CACHE_DIR):
+    if not os.path.isdir(cache_dir): return
+    for name in os.listdir(cache_dir):
+        if name.endswith(EXTENSION): os.remove(os.path.join(cache_dir, name))
+
+
+def parse_jbi_file(filepath, cache_dir=CACHE_DIR):
+    """Comme jbiParser.parse_jbi_file, mais sans re-parser un contenu déjà vu."""
+    key = file_key(filepath)
+    program = load(key, cache_dir)
+    if program is None:
+        program = jbiParser.parse_jbi_file(filepath)
+        store(key, program, cache_dir)
+    return program
+
+
+if __name__ == "__main__":
+    import sys
+    for path in sys.argv[1:]:
+        t0 = time.time()
+        prog = parse_jbi_file(path)
+        print("{} : {} mouvements en {:.3f} s".format(prog.job_name, len(prog.moves), time.time() - t0))
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Repères et cinématique des positions JBI, indépendants de Rhino.
+
+Une position rectangulaire (x, y, z, Rx, Ry, Rz) est convertie en matrice 4x4
+avec la convention Yaskawa R = Rz * Ry * Rx (angles en degrés), puis exprimée
+dans le monde selon son ///POSTYPE :
+    BASE / ROBOT : monde = base * pose
+    USER         : monde = base * repère utilisateur * pose
+    PULSE        : monde = base * cinématique directe(impulsions)
+Les positions TOOL / MTOOL (relatives à l'outil courant) ne sont pas convertibles.
+
+Toute la table est convertie en un seul lot : vectorisé avec NumPy s'il est
+disponible, boucle pure Python sinon (IronPython).
+"""
+import json
+import math
+
+from poseTable import np, PULSE, BASE, ROBOT, USER
+
+IDENTITY = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+
+def rpy_to_matrix(x, y, z, rx, ry, rz):
+    """Position Yaskawa -> matrice 4x4 (liste de lignes)."""
+    a, b, c = math.radians(rx), math.radians(ry), math.radians(rz)
+    cx, sx = math.cos(a), math.sin(a)
+    cy, sy = math.cos(b), math.sin(b)
+    cz, sz = math.cos(c), math.sin(c)
+    return [[cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx, x],
+            [sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx, y],
+            [-sy, cy * sx, cy * cx, z],
+            [0.0, 0.0, 0.0, 1.0]]
+
+
+def rpy_from_matrix(m):
+    """
+    Matrice de rotation 3x3 (ou 4x4, m[ligne][colonne]) -> (Rx, Ry, Rz) en degrés,
+    convention Yaskawa R = Rz * Ry * Rx.
+    """
+    ry = math.atan2(-m[2][0], math.sqrt(m[0][0] * m[0][0] + m[1][0] * m[1][0]))
+    if abs(math.cos(ry)) > 1e-9:
+        rx = math.atan2(m[2][1], m[2][2])
+        rz = math.atan2(m[1][0], m[0][0])
+    else:
+        # Blocage de cardan : Rz arbitraire à 0
+        rx = math.atan2(-m[1][2], m[1][1])
+        rz = 0.0
+    return (math.degrees(rx), math.degrees(ry), math.degrees(rz))
+
+
+def matrix_to_pose(m):
+    """Matrice 4x4 -> (x, y, z, Rx, Ry, Rz)."""
+    return (m[0][3], m[1][3], m[2][3]) + rpy_from_matrix(m)
+
+
+def rigid_inverse(m):
+    """Inverse d'une matrice 4x4 rigide (rotation + translation)."""
+    rt = [[m[c][r] for c in range(3)] for r in range(3)]
+    t = [-sum(rt[r][c] * m[c][3] for c in range(3)) for r in range(3)]
+    return [rt[r] + [t[r]] for r in range(3)] + [[0.0, 0.0, 0.0, 1.0]]
+
+
+def mat_mul(a, b):
+    return [[a[i][0] * b[0][j] + a[i][1] * b[1][j] + a[i][2] * b[2][j] + a[i][3] * b[3][j]
+             for j in range(4)] for i in range(4)]
+
+
+class KinematicModel(object):
+    """
+    Cinématique directe d'un bras 6 axes en Denavit-Hartenberg standard.
+    dh : [(a, alpha_deg, d, theta_offset_deg), ...] par axe (S, L, U, R, B, T).
+    pulses_per_degree / zero_pulses : conversion impulsions -> degrés par axe.
+    tools : {numéro d'outil: matrice 4x4 bride -> TCP}.
+    """
+    def __init__(self, dh, pulses_per_degree, zero_pulses=None, tools=None):
+        self.dh = [tuple(float(v) for v in row) for row in dh]
+        self.pulses_per_degree = [float(v) for v in pulses_per_degree]
+        self.zero_pulses = [float(v) for v in zero_pulses] if zero_pulses else [0.0] * len(self.dh)
+        self.tools = tools or {}
+
+    @classmethod
+    def load(cls, filepath):
+        """Charge un modèle JSON {"dh": ..., "pulses_per_degree": ..., "zero_pulses": ..., "tools": {...}}."""
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+        tools = dict((int(k), v) for k, v in data.get("tools", {}).items())
+        return cls(data["dh"], data["pulses_per_degree"], data.get("zero_pulses"), tools)
+
+    def joint_angles(self, pulses):
+        return [(p - z) / k for p, z, k in zip(pulses, self.zero_pulses, self.pulses_per_degree)]
+
+    def forward(self, pulses, tool=0):
+        m = IDENTITY
+        for (a, alpha, d, offset), theta in zip(self.dh, self.joint_angles(pulses)):
+            t, al = math.radians(theta + offset), math.radians(alpha)
+            ct, st, ca, sa = math.cos(t), math.sin(t), math.cos(al), math.sin(al)
+            m = mat_mul(m, [[ct, -st * ca, st * sa, a * ct],
+                            [st, ct * ca, -ct * sa, a * st],
+                            [0.0, sa, ca, d],
+                            [0.0, 0.0, 0.0, 1.0]])
+        if tool in self.tools: m = mat_mul(m, self.tools[tool])
+        return m
+
+
+def _row_frame(table, row, base, user_frames):
+    """Repère monde dans lequel est exprimée une position rectangulaire (None = non convertible)."""
+    postype = table.postype[row]
+    if postype in (BASE, ROBOT): return base
+    if postype == USER: return mat_mul(base, user_frames.get(table.user[row], IDENTITY))
+    return None
+
+
+def _pose_matrices_python(table, base, user_frames):
+    result = []
+    for row in range(len(table)):
+        if table.postype[row] == PULSE:
+            result.append(None)
+            continue
+        frame = _row_frame(table, row, base, user_frames)
+        result.append(None if frame is None else mat_mul(frame, rpy_to_matrix(*table.pose(row))))
+    return result
+
+
+def _pose_matrices_numpy(table, base, user_frames):
+    cols = table.as_numpy()
+    n = len(table)
+    a, b, c = np.radians(cols["rx"]), np.radians(cols["ry"]), np.radians(cols["rz"])
+    cx, sx, cy, sy, cz, sz = np.cos(a), np.sin(a), np.cos(b), np.sin(b), np.cos(c), np.sin(c)
+
+    local = np.zeros((n, 4, 4))
+    local[:, 0, 0] = cz * cy
+    local[:, 0, 1] = cz * sy * sx - sz * cx
+    local[:, 0, 2] = cz * sy * cx + sz * sx
+    local[:, 1, 0] = sz * cy
+    local[:, 1, 1] = sz * sy * sx + cz * cx
+    local[:, 1, 2] = sz * sy * cx - cz * sx
+    local[:, 2, 0] = -sy
+    local[:, 2, 1] = cy * sx
+    local[:, 2, 2] = cy * cx
+    local[:, 0, 3] = cols["x"]
+    local[:, 1, 3] = cols["y"]
+    local[:, 2, 3] = cols["z"]
+    local[:, 3, 3] = 1.0
+
+    # Un repère par ligne, puis un seul produit matriciel pour toute la table
+    frames = np.empty((n, 4, 4))
+    frames[:] = np.nan
+    postype, user = cols["postype"], cols["user"]
+    rect = (postype == BASE) | (postype == ROBOT)
+    frames[rect] = np.array(base)
+    for u in np.unique(user[postype == USER]):
+        frames[(postype == USER) & (user == u)] = np.dot(np.array(base), np.array(user_frames.get(int(u), IDENTITY)))
+    world = np.matmul(frames, local).tolist()
+
+    valid = ~np.isnan(frames[:, 0, 0])
+    return [world[row] if valid[row] else None for row in range(n)]
+
+
+def pose_matrices(table, base=None, user_frames=None, kinematics=None):
+    """
+    Matrices monde 4x4 de toutes les lignes d'une PoseTable (None si non convertible).
+    base : placement de la base robot dans le monde ; user_frames : {n: matrice dans la base}.
+    kinematics : KinematicModel pour les positions PULSE.
+    """
+    if base is None: base = IDENTITY
+    if user_frames is None: user_frames = {}
+    if np is not None and len(table):
+        result = _pose_matrices_numpy(table, base, user_frames)
+    else:
+        result = _pose_matrices_python(table, base, user_frames)
+
+    if kinematics is not None:
+        for row in range(len(table)):
+            if table.postype[row] == PULSE:
+                result[row] = mat_mul(base, kinematics.forward(table.pose(row), table.tool[row]))
+    return result
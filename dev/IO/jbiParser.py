@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Parseur JBI (Yaskawa) indépendant de Rhino.
+
+Le fichier est lu en une seule passe, ligne par ligne : l'en-tête et la table
+des positions (C####) sont remplis au fil de l'eau et chaque instruction de
+mouvement du bloc NOP produit un enregistrement JbiMove.
+
+Utilisable hors Rhino pour les benchmarks :
+    python jbiParser.py programme.jbi [autre.jbi ...]
+"""
+import re
+import sys
+import time
+from collections import namedtuple
+
+from poseTable import PoseTable, c_number, POSTYPES, PULSE, ROBOT
+
+PARSER_VERSION = 3
+
+# Type, C_ID, BC_ID(opt), V_Type(opt), V_Val(opt), PL(opt), Comment(opt)
+MOVE_RE = re.compile(r"(MOVL|MOVJ|SMOVL)\s+(C\d+)(?:\s+(BC\d+))?(?:\s+(V|VJ)=([\d\.]+))?(?:\s+PL=(\d+))?(?:.*//(.*))?")
+POS_RE = re.compile(r"^(C\d+)=(.*)$")
+BC_POS_RE = re.compile(r"^BC(\d+)=(.*)$")
+# Lignes de contexte des positions (reprises telles quelles pour la table BC)
+CONTEXT_PREFIXES = ("///TOOL", "///USER", "///POSTYPE", "///PULSE", "///RECTAN", "///RCONF")
+
+# arc_cmd : instruction ARCON/ARCOF complète (arguments compris) qui précède le mouvement, ou None
+JbiMove = namedtuple("JbiMove", "index move_type c_id bc_id speed_type speed pl comment arcon pos_row arc_cmd")
+JbiParseResult = namedtuple("JbiParseResult", "path program seconds error")
+
+
+class JbiProgram(object):
+    """
+    En-tête, table des positions et mouvements d'un job JBI.
+    Chaque JbiMove référence sa position par son numéro de ligne (pos_row)
+    dans la PoseTable 'positions'.
+    bc_positions : {n° BC: (valeurs texte, lignes de contexte)} (axes externes de base).
+    unsupported : types de positions non gérés présents dans ///NPOS (EC, P, BP, EX).
+    trailing_arc : instruction ARCON/ARCOF située après le dernier mouvement.
+    groups : lignes ///GROUPn (groupes d'axes) de l'en-tête.
+    """
+    def __init__(self):
+        self.job_name = "NONAME"
+        self.folder_name = ""
+        self.positions = PoseTable()
+        self.bc_positions = {}
+        self.unsupported = []
+        self.trailing_arc = None
+        self.groups = []
+        self.moves = []
+
+    def __len__(self):
+        return len(self.moves)
+
+
+def iter_jbi(lines, program=None):
+    """
+    Parcourt les lignes une seule fois et produit les JbiMove au fil de l'eau.
+    L'en-tête et les positions sont écrits dans 'program' pendant la lecture.
+    """
+    if program is None: program = JbiProgram()
+    positions = program.positions
+    move_search = MOVE_RE.search
+    pos_match = POS_RE.match
+
+    # ETAT PAR DEFAUT = ARCOF (False)
+    arcon = False
+    in_nop = False
+    idx = 0
+    # Contexte des positions suivantes (///POSTYPE, ///USER, ///TOOL, ///RCONF)
+    postype, user, tool, rconf = ROBOT, 0, 0, None
+    context_lines = []
+    bc_context = ()
+    arc_cmd = None
+
+    for line in lines:
+        raw = line.strip()
+        if not raw: continue
+
+        if not in_nop:
+            if raw.startswith(CONTEXT_PREFIXES): context_lines.append(raw)
+            if raw == "NOP":
+                in_nop = True
+            elif raw.startswith("//NAME"):
+                program.job_name = raw.split(" ")[1]
+            elif raw.startswith("///FOLDERNAME"):
+                program.folder_name = raw.split(" ")[1]
+            elif raw.startswith("///GROUP"):
+                program.groups.append(raw)
+            elif raw.startswith("///NPOS"):
+                counts = raw.split(" ")[1].split(",")
+                program.unsupported = [name for name, n in zip(("EC", "P", "BP", "EX"), counts[2:]) if int(n)]
+            elif raw.startswith("///POSTYPE"):
+                name = raw.split(" ")[1]
+                if name in POSTYPES: postype = POSTYPES.index(name)
+            elif raw == "///PULSE":
+                postype = PULSE
+            elif raw.startswith("///USER"):
+                user = int(raw.split(" ")[1])
+            elif raw.startswith("///TOOL"):
+                tool = int(raw.split(" ")[1])
+            elif raw.startswith("///RCONF"):
+                rconf = raw.split(" ", 1)[1].strip()
+            elif raw[0] == "C":
+                context_lines = []
+                m = pos_match(raw)
+                if m:
+                    try:
+                        values = [float(v) for v in m.group(2).split(",")]
+                    except ValueError: continue
+                    if len(values) >= 3:
+                        positions.append(values, c_number(m.group(1)), postype=postype, user=user, tool=tool,
+                                         rconf=None if postype == PULSE else rconf)
+            elif raw.startswith("BC"):
+                m = BC_POS_RE.match(raw)
+                if m:
+                    if context_lines: bc_context = tuple(context_lines)
+                    context_lines = []
+                    program.bc_positions[int(m.group(1))] = (m.group(2).strip(), bc_context)
+            continue
+
+        if raw == "END": continue
+
+        # 1. Mise à jour de l'état AVANT de traiter la pose courante (instruction conservée)
+        if "ARCON" in raw:
+            arcon = True
+            arc_cmd = raw
+        elif "ARCOF" in raw:
+            arcon = False
+            arc_cmd = raw
+
+        if "MOV" not in raw: continue
+        m = move_search(raw)
+        if not m: continue
+
+        m_type, c_id, bc_id, v_type, v_val, pl_val, comment = m.groups()
+        row = positions.row_of(c_number(c_id))
+        if row is None: continue
+
+        if comment: comment = comment.strip()
+        yield JbiMove(idx, m_type, c_id, bc_id, v_type, v_val, pl_val, comment, arcon, row, arc_cmd)
+        arc_cmd = None
+        idx += 1
+    program.trailing_arc = arc_cmd
+
+
+def parse_jbi(lines):
+    """Parse un itérable de lignes et renvoie un JbiProgram complet."""
+    program = JbiProgram()
+    program.moves = list(iter_jbi(lines, program))
+    return program
+
+
+def iter_jbi_file(filepath, program=None):
+    """Version fichier de iter_jbi : le fichier n'est jamais chargé en entier."""
+    with open(filepath, 'r') as f:
+        for move in iter_jbi(f, program):
+            yield move
+
+
+def parse_jbi_file(filepath):
+    """Parse un fichier JBI en une seule passe."""
+    with open(filepath, 'r') as f:
+        return parse_jbi(f)
+
+
+def cpu_count():
+    if sys.platform == "cli":
+        import System
+        return System.Environment.ProcessorCount
+    import multiprocessing
+    return multiprocessing.cpu_count()
+
+
+def timed_parse(filepath, use_cache=False):
+    """Parse un fichier et renvoie un JbiParseResult (l'erreur éventuelle est capturée)."""
+    t0 = time.time()
+    program, error = None, None
+    try:
+        if use_cache:
+            import jbiCache
+            program = jbiCache.parse_jbi_file(filepath)
+        else:
+            program = parse_jbi_file(filepath)
+    except Exception as e:
+        error = str(e)
+    return JbiParseResult(filepath, program, time.time() - t0, error)
+
+
+def _timed_parse_args(args):
+    return timed_parse(*args)
+
+
+def _parse_threaded(paths, workers, use_cache):
+    """IronPython n'a pas de GIL : des threads suffisent à paralléliser le parsing."""
+    import threading
+    results = [None] * len(paths)
+    lock = threading.Lock()
+    cursor = [0]
+
+    def worker():
+        while True:
+            with lock:
+                i = cursor[0]
+                cursor[0] += 1
+            if i >= len(paths): return
+            results[i] = timed_parse(paths[i], use_cache)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return results
+
+
+def parse_jbi_files(paths, workers=None, use_cache=False):
+    """
+    Parse plusieurs fichiers en parallèle ; les JbiParseResult sont renvoyés
+    dans l'ordre de 'paths'.
+    CPython : pool de processus. IronPython : pool de threads.
+    use_cache : passe par le cache disque (jbiCache).
+    """
+    paths = list(paths)
+    if workers is None: workers = min(len(paths), cpu_count())
+    if workers <= 1 or len(paths) < 2:
+        return [timed_parse(p, use_cache) for p in paths]
+    if sys.platform == "cli":
+        return _parse_threaded(paths, workers, use_cache)
+
+    try:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+    except (ImportError, OSError, NotImplementedError):
+        return _parse_threaded(paths, workers, use_cache)
+    try:
+        return pool.map(_timed_parse_args, [(p, use_cache) for p in paths], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+if __name__ == "__main__":
+    t0 = time.time()
+    for res in parse_jbi_files(sys.argv[1:]):
+        if res.error:
+            print("{} : ERREUR {}".format(res.path, res.error))
+            continue
+        prog = res.program
+        print("{} : {} positions, {} mouvements en {:.3f} s".format(
+            prog.job_name, len(prog.positions), len(prog.moves), res.seconds))
+    print("Total : {:.3f} s".format(time.time() - t0))
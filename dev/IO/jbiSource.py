@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage compressé du source JBI d'un programme.
+
+Le texte original est compressé (zlib) puis encodé en base64 pour tenir dans
+une chaîne de la table de chaînes du document (section SOURCE_SECTION,
+clé = nom du bloc programme). Indépendant de Rhino.
+"""
+import base64
+import zlib
+
+SOURCE_SECTION = "PicksoulJBI"
+SOURCE_KEY = "source_key"
+CHUNK_SIZE = 1 << 16
+
+
+def compress_file(filepath, level=9):
+    """Compresse un fichier par blocs (mémoire constante) et renvoie le payload base64."""
+    comp = zlib.compressobj(level)
+    parts = []
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk: break
+            parts.append(comp.compress(chunk))
+    parts.append(comp.flush())
+    return base64.b64encode(b"".join(parts)).decode("ascii")
+
+
+def decompress_source(payload, encoding="utf-8"):
+    """Payload base64 -> texte JBI."""
+    raw = zlib.decompress(base64.b64decode(payload))
+    return raw.decode(encoding, "replace")
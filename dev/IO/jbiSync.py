@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Resynchronisation d'un programme déjà importé avec une nouvelle version du JBI,
+indépendante de Rhino.
+
+Chaque mouvement est résumé par une empreinte (move_hash) stockée en UserText
+"Hash" sur la pose. Les poses existantes sont appariées aux mouvements par leur
+ID_C (dans l'ordre du programme en cas de C réutilisé) : seules les poses
+ajoutées, modifiées, renumérotées ou supprimées sont touchées, et seules les
+trajectoires dont le contenu a changé sont recréées.
+"""
+import hashlib
+from collections import deque, namedtuple
+
+ExistingPose = namedtuple("ExistingPose", "uuid c_id hash index")
+ExistingCurve = namedtuple("ExistingCurve", "uuid state pose_uuids first_index")
+SyncPlan = namedtuple("SyncPlan", "targets to_add to_update to_rename to_delete")
+CurvePlan = namedtuple("CurvePlan", "keep to_renumber to_create to_delete")
+
+
+def move_hash(mv, pose, context=()):
+    """
+    Empreinte stable (entre sessions et versions de Python) d'un mouvement.
+    context : valeurs de position associées (outil, RCONF, position BC).
+    """
+    fields = [mv.move_type, mv.c_id, mv.bc_id or "", mv.speed_type or "", mv.speed or "",
+              mv.pl or "", mv.comment or "", "1" if mv.arcon else "0", mv.arc_cmd or ""]
+    fields.extend(context)
+    fields.extend(["{:.4f}".format(v) for v in pose])
+    return hashlib.sha1("|".join(fields).encode("utf-8")).hexdigest()[:16]
+
+
+def plan_sync(existing, moves, hashes):
+    """
+    existing : ExistingPose du programme, dans l'ordre du programme.
+    moves / hashes : nouveaux mouvements et leurs empreintes.
+    targets[i] : uuid de la pose existante réutilisée pour le mouvement i (None = à créer).
+    """
+    pools = {}
+    for e in existing:
+        pools.setdefault(e.c_id, deque()).append(e)
+
+    targets = [None] * len(moves)
+    to_add, to_update, to_rename = [], [], []
+    for i, mv in enumerate(moves):
+        pool = pools.get(mv.c_id)
+        if not pool:
+            to_add.append(i)
+            continue
+        e = pool.popleft()
+        targets[i] = e.uuid
+        if e.hash != hashes[i]: to_update.append(i)
+        elif e.index != i: to_rename.append(i)
+
+    to_delete = [e.uuid for pool in pools.values() for e in pool]
+    return SyncPlan(targets, to_add, to_update, to_rename, to_delete)
+
+
+def plan_curves(existing_curves, runs, pose_uuids, dirty_rows):
+    """
+    existing_curves : ExistingCurve du programme.
+    runs : segments (début, fin, état) de PoseTable.state_runs.
+    pose_uuids : uuid final de chaque ligne ; dirty_rows : lignes ajoutées/modifiées.
+    keep[k] : courbe existante réutilisée pour le segment k (None = à créer).
+    """
+    by_signature = {}
+    for crv in existing_curves:
+        by_signature[(crv.state, tuple(crv.pose_uuids))] = crv
+
+    keep = []
+    to_renumber, to_create = [], []
+    used = set()
+    for k, (start, end, state) in enumerate(runs):
+        crv = by_signature.get((state, tuple(pose_uuids[start:end + 1])))
+        if crv is None or crv.uuid in used or any(r in dirty_rows for r in range(start, end + 1)):
+            keep.append(None)
+            to_create.append(k)
+            continue
+        used.add(crv.uuid)
+        keep.append(crv.uuid)
+        if crv.first_index != start: to_renumber.append(k)
+
+    to_delete = [crv.uuid for crv in existing_curves if crv.uuid not in used]
+    return CurvePlan(keep, to_renumber, to_create, to_delete)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Écriture d'un job JBI (Yaskawa) à partir d'un JbiProgram, indépendante de Rhino.
+
+Symétrique de jbiParser : table des positions (PoseTable) + liste de JbiMove.
+Les lignes sont produites par un générateur et écrites au fil de l'eau.
+Aucune valeur n'est inventée : une configuration (RCONF) inconnue, ou un
+changement d'état sans aucune instruction ARCON/ARCOF de ce type dans le job,
+lève JbiWriteError au lieu d'écrire une valeur par défaut.
+"""
+import os
+import time
+
+from poseTable import POSTYPES, PULSE, USER
+
+CRLF = "\r\n"
+
+
+class JbiWriteError(ValueError):
+    pass
+
+
+def format_position(c_num, pose, pulse=False):
+    if pulse: return "C{:05d}={}".format(c_num, ",".join(str(int(round(v))) for v in pose))
+    return "C{:05d}={:.3f},{:.3f},{:.3f},{:.4f},{:.4f},{:.4f}".format(c_num, *pose)
+
+
+def is_arcon_cmd(cmd):
+    return "ARCON" in cmd
+
+
+def format_move(mv, c_num):
+    parts = [mv.move_type, "C{:05d}".format(c_num)]
+    if mv.bc_id: parts.append(mv.bc_id)
+    if mv.speed: parts.append("{}={}".format(mv.speed_type or "V", mv.speed))
+    if mv.pl: parts.append("PL={}".format(mv.pl))
+    line = " ".join(parts)
+    if mv.comment: line += " //" + mv.comment
+    return line
+
+
+def iter_jbi_lines(program, date=None):
+    """Produit les lignes (sans fin de ligne) du job JBI."""
+    positions = program.positions
+    if date is None: date = time.strftime("%Y/%m/%d %H:%M")
+
+    yield "/JOB"
+    yield "//NAME {}".format(program.job_name)
+    yield "//POS"
+    yield "///NPOS {},{},0,0,0,0".format(len(positions), len(program.bc_positions))
+    # Le contexte (///TOOL, ///USER, ///POSTYPE, ///RCONF) n'est réécrit qu'à son changement
+    context = None
+    for row in range(len(positions)):
+        postype, user, tool, rconf = positions.postype[row], positions.user[row], positions.tool[row], positions.rconf[row]
+        if postype != PULSE and not rconf:
+            raise JbiWriteError("C{:05d} : configuration RCONF inconnue.".format(positions.c_id[row]))
+        if context != (postype, user, tool, rconf):
+            yield "///TOOL {}".format(tool)
+            if postype == PULSE:
+                yield "///PULSE"
+            else:
+                if postype == USER: yield "///USER {}".format(user)
+                yield "///POSTYPE {}".format(POSTYPES[postype])
+                yield "///RECTAN"
+                yield "///RCONF {}".format(rconf)
+            context = (postype, user, tool, rconf)
+        yield format_position(positions.c_id[row], positions.pose(row), postype == PULSE)
+    # Positions des axes de base (BC), avec leurs lignes de contexte d'origine
+    bc_context = None
+    for bc_num in sorted(program.bc_positions):
+        values, lines = program.bc_positions[bc_num]
+        if lines != bc_context:
+            for line in lines: yield line
+            bc_context = lines
+        yield "BC{:05d}={}".format(bc_num, values)
+    yield "//INST"
+    yield "///DATE {}".format(date)
+    if program.folder_name: yield "///FOLDERNAME {}".format(program.folder_name)
+    yield "///ATTR SC,RW"
+    if program.groups:
+        for line in program.groups: yield line
+    elif program.bc_positions:
+        raise JbiWriteError("Groupes d'axes (///GROUP) inconnus pour un job avec axes de base.")
+    else:
+        yield "///GROUP1 RB1"
+    yield "NOP"
+
+    # ETAT PAR DEFAUT = ARCOF : l'instruction d'origine (arguments compris) est réécrite
+    # à chaque changement d'état, ou si elle modifie les conditions d'un état déjà actif.
+    # Sans instruction propre (pose copiée au rebuild), on reprend la dernière du même type,
+    # ou à défaut la première du job.
+    known = {True: [], False: []}
+    for cmd in [mv.arc_cmd for mv in program.moves] + [program.trailing_arc]:
+        if cmd: known[is_arcon_cmd(cmd)].append(cmd)
+    last_of_kind = dict((kind, cmds[0] if cmds else None) for kind, cmds in known.items())
+    arcon = False
+    last_cmd = None
+    for mv in program.moves:
+        cmd = mv.arc_cmd
+        if cmd: last_of_kind[is_arcon_cmd(cmd)] = cmd
+        if mv.arcon != arcon:
+            if not cmd or is_arcon_cmd(cmd) != mv.arcon: cmd = last_of_kind[mv.arcon]
+            if not cmd:
+                raise JbiWriteError("{} C{:05d} : aucune instruction {} dans le job.".format(
+                    mv.move_type, positions.c_id[mv.pos_row], "ARCON" if mv.arcon else "ARCOF"))
+            yield cmd
+            last_cmd = cmd
+        elif cmd and cmd != last_cmd and is_arcon_cmd(cmd) == arcon:
+            yield cmd
+            last_cmd = cmd
+        arcon = mv.arcon
+        yield format_move(mv, positions.c_id[mv.pos_row])
+    if program.trailing_arc: yield program.trailing_arc
+    yield "END"
+
+
+def write_jbi(program, filepath, date=None):
+    """
+    Écrit le job sur disque (fins de ligne CRLF comme sur le contrôleur).
+    Sur JbiWriteError, le fichier partiel est supprimé.
+    """
+    try:
+        with open(filepath, 'wb') as f:
+            for line in iter_jbi_lines(program, date):
+                f.write((line + CRLF).encode("utf-8"))
+    except JbiWriteError:
+        os.remove(filepath)
+        raise
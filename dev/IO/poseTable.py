@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Table de poses compacte, indépendante de Rhino.
+
+Les poses sont stockées en colonnes parallèles (array('d') / array('b'))
+plutôt qu'en listes de dictionnaires : une ligne = une pose.
+Partagée par importYaskawaJBI.py, jbiParser.py et rebuildPrograms.py.
+"""
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ARCOF = 0
+ARCON = 1
+
+# ///POSTYPE du JBI
+PULSE, BASE, ROBOT, TOOL, USER, MTOOL = range(6)
+POSTYPES = ("PULSE", "BASE", "ROBOT", "TOOL", "USER", "MTOOL")
+
+
+def c_number(c_id):
+    """'C00012' -> 12"""
+    return int(c_id[1:])
+
+
+def _to_bytes(col):
+    return col.tobytes() if hasattr(col, "tobytes") else col.tostring()
+
+
+def _from_bytes(col, data):
+    if hasattr(col, "frombytes"): col.frombytes(data)
+    else: col.fromstring(data)
+
+
+def state_runs(states, lead=0):
+    """
+    Découpe un tableau d'états en segments ARCON/ARCOF : liste de (début, fin, état).
+    Deux segments consécutifs partagent la pose de transition.
+    'lead' : ligne dont l'état définit le premier segment.
+    """
+    n = len(states)
+    if n < 2: return []
+    first = max(1, lead + 1)
+    if np is not None and isinstance(states, array):
+        st = np.frombuffer(states, dtype=states.typecode)
+        breaks = (np.flatnonzero(st[first:] != st[first - 1:-1]) + first).tolist()
+    else:
+        breaks = [i for i in range(first, n) if states[i] != states[i - 1]]
+    starts = [0] + [b - 1 for b in breaks]
+    ends = [b - 1 for b in breaks] + [n - 1]
+    values = [states[lead]] + [states[b] for b in breaks]
+    return list(zip(starts, ends, values))
+
+
+class PoseTable(object):
+    """
+    Colonnes : c_id, x, y, z, rx, ry, rz, state, postype, user, tool (+ uuid et rconf optionnels).
+    Pour une position PULSE, x..rz contiennent les impulsions des axes S, L, U, R, B, T.
+    rconf : configuration du bras (texte de ///RCONF), None si inconnue ou PULSE.
+    """
+    COLUMNS = ("c_id", "x", "y", "z", "rx", "ry", "rz", "state", "postype", "user", "tool")
+
+    def __init__(self):
+        self.c_id = array('l')
+        self.x = array('d')
+        self.y = array('d')
+        self.z = array('d')
+        self.rx = array('d')
+        self.ry = array('d')
+        self.rz = array('d')
+        self.state = array('b')
+        self.postype = array('b')
+        self.user = array('b')
+        self.tool = array('b')
+        self.uuid = []
+        self.rconf = []
+        self._rows_by_c = {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def append(self, values, c_id=-1, state=ARCOF, uuid=None, postype=ROBOT, user=0, tool=0, rconf=None):
+        """Ajoute une pose (x, y, z[, rx, ry, rz]) et renvoie son numéro de ligne."""
+        row = len(self.x)
+        self.x.append(values[0])
+        self.y.append(values[1])
+        self.z.append(values[2])
+        if len(values) >= 6:
+            self.rx.append(values[3])
+            self.ry.append(values[4])
+            self.rz.append(values[5])
+        else:
+            self.rx.append(0.0)
+            self.ry.append(0.0)
+            self.rz.append(0.0)
+        self.c_id.append(c_id)
+        self.state.append(state)
+        self.postype.append(postype)
+        self.user.append(user)
+        self.tool.append(tool)
+        self.uuid.append(uuid)
+        self.rconf.append(rconf)
+        if c_id >= 0: self._rows_by_c[c_id] = row
+        return row
+
+    def row_of(self, c_id):
+        """Ligne de la position C donnée (entier), ou None."""
+        return self._rows_by_c.get(c_id)
+
+    def point(self, row):
+        return (self.x[row], self.y[row], self.z[row])
+
+    def pose(self, row):
+        return (self.x[row], self.y[row], self.z[row], self.rx[row], self.ry[row], self.rz[row])
+
+    def points(self, start=0, end=None):
+        """Points (x, y, z) des lignes [start, end]."""
+        if end is None: end = len(self.x) - 1
+        x, y, z = self.x, self.y, self.z
+        return [(x[i], y[i], z[i]) for i in range(start, end + 1)]
+
+    def is_arcon(self, row):
+        return self.state[row] == ARCON
+
+    def state_runs(self, lead=0):
+        return state_runs(self.state, lead)
+
+    def __getstate__(self):
+        # Colonnes sérialisées en octets : pickle compact et identique sous IronPython
+        state = dict((name, _to_bytes(getattr(self, name))) for name in self.COLUMNS)
+        state["uuid"] = self.uuid
+        state["rconf"] = self.rconf
+        return state
+
+    def __setstate__(self, state):
+        self.__init__()
+        for name in self.COLUMNS:
+            _from_bytes(getattr(self, name), state[name])
+        self.uuid = state["uuid"]
+        self.rconf = state.get("rconf", [None] * len(self.uuid))
+        for row, c_id in enumerate(self.c_id):
+            if c_id >= 0: self._rows_by_c[c_id] = row
+
+    def as_numpy(self):
+        """Vues NumPy (sans copie) des colonnes numériques, ou None sans NumPy."""
+        if np is None: return None
+        views = {}
+        for name in self.COLUMNS:
+            col = getattr(self, name)
+            views[name] = np.frombuffer(col, dtype=col.typecode) if len(col) else np.zeros(0, col.typecode)
+        return views
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Index des objets des programmes, construit en un seul parcours du document.
+
+Chaque instance de bloc et chaque courbe est lue une fois (calque + UserText) :
+les recherches du rebuild (copies par uuid_origin, poses par calque, poses
+d'une courbe) deviennent des accès dictionnaire au lieu de balayages.
+L'index est une photographie : il ne suit pas les objets créés ensuite.
+"""
+import Rhino
+import scriptcontext as sc
+
+import programTopology
+
+def _user_text(attr):
+    nvc = attr.GetUserStrings()
+    return dict((k, nvc.Get(k)) for k in nvc.AllKeys)
+
+class ProgramIndex(object):
+    def __init__(self, doc=None):
+        doc = doc or sc.doc
+        self.text = {}            # id -> {clé: valeur}
+        self.layer = {}           # id -> chemin complet du calque
+        self.name = {}            # id -> nom de l'objet
+        self.points = {}          # id instance -> point d'insertion (x, y, z)
+        self.programs = []        # ids des blocs programme
+        self.poses_by_layer = {}  # calque -> [ids des poses]
+        self.derived = {}         # uuid_origin -> [ids des copies (hors original)]
+
+        settings = Rhino.DocObjects.ObjectEnumeratorSettings()
+        settings.ObjectTypeFilter = Rhino.DocObjects.ObjectType.InstanceReference | Rhino.DocObjects.ObjectType.Curve
+        settings.NormalObjects = True
+        settings.LockedObjects = True
+        settings.HiddenObjects = True
+
+        layer_paths = {}
+        for obj in doc.Objects.GetObjectList(settings):
+            attr = obj.Attributes
+            obj_id = str(obj.Id)
+            text = _user_text(attr)
+            lyr = layer_paths.get(attr.LayerIndex)
+            if lyr is None:
+                lyr = doc.Layers[attr.LayerIndex].FullPath
+                layer_paths[attr.LayerIndex] = lyr
+            self.text[obj_id] = text
+            self.layer[obj_id] = lyr
+            self.name[obj_id] = attr.Name or ""
+
+            if isinstance(obj, Rhino.DocObjects.InstanceObject):
+                pt = obj.InsertionPoint
+                self.points[obj_id] = (pt.X, pt.Y, pt.Z)
+                if text.get("type") == "program":
+                    self.programs.append(obj_id)
+                elif obj.InstanceDefinition.Name == "Pose":
+                    self.poses_by_layer.setdefault(lyr, []).append(obj_id)
+
+            origin = text.get("uuid_origin")
+            if origin and origin != obj_id:
+                self.derived.setdefault(origin, []).append(obj_id)
+
+    def get(self, obj_id, key):
+        text = self.text.get(str(obj_id))
+        return text.get(key) if text else None
+
+    def copies(self, origin_uuid, selected_ids=None, layer=None):
+        """Copies manuelles d'un objet (filtrées par sélection et calque si fournis)."""
+        result = []
+        for c in self.derived.get(str(origin_uuid), ()):
+            if selected_ids and c not in selected_ids: continue
+            if layer is not None and self.layer[c] != layer: continue
+            result.append(c)
+        return result
+
+    def _getter(self, obj_id):
+        return (self.text.get(str(obj_id)) or {}).get
+
+    def curve_poses(self, crv_id):
+        return programTopology.curve_poses(self._getter(crv_id))
+
+    def curve_topology(self, crv_id):
+        return programTopology.curve_topology(self._getter(crv_id))
+
+    def program_curves(self, prog_id):
+        return programTopology.program_curves(self._getter(prog_id))
+
+    def exists(self, obj_id):
+        return str(obj_id) in self.text
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Registre des programmes du document : blocs programme, calques, courbes et poses.
+
+Construit en un seul parcours au premier appel puis tenu à jour par les
+événements RhinoDoc (utilities/docEvents.py) : les commandes qui cherchent
+le programme d'une sélection ou parcourent sa topologie n'ont plus à balayer
+toutes les instances de blocs ni à relire leur UserText.
+Les calques sont mémorisés par index : un renommage de calque reste cohérent.
+"""
+import Rhino
+import System
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+import docEvents
+import programTopology
+
+REGISTRY_KEY = "program_registry"
+
+class ProgramRegistry(object):
+    def __init__(self, doc):
+        self.doc = doc
+        self.programs = {}  # id bloc programme -> (index calque, [uuids courbes])
+        self.curves = {}    # id courbe -> (n° première pose, [uuids poses])
+        self.poses = {}     # id instance Pose -> index calque
+        self._sequences = {}  # id programme -> ([uuids poses dans l'ordre], {uuid: rang})
+
+        settings = Rhino.DocObjects.ObjectEnumeratorSettings()
+        settings.ObjectTypeFilter = Rhino.DocObjects.ObjectType.InstanceReference | Rhino.DocObjects.ObjectType.Curve
+        settings.NormalObjects = True
+        settings.LockedObjects = True
+        settings.HiddenObjects = True
+        for obj in doc.Objects.GetObjectList(settings):
+            self.on_object(str(obj.Id), obj, obj.Attributes)
+
+    def on_object(self, obj_id, obj, attr):
+        """Met à jour l'entrée d'un objet (appelé par docEvents) ; obj None = supprimé."""
+        if self.programs.pop(obj_id, None) is not None or self.curves.pop(obj_id, None) is not None:
+            self._sequences.clear()
+        self.poses.pop(obj_id, None)
+        if obj is None: return
+
+        get = attr.GetUserString
+        if isinstance(obj, Rhino.DocObjects.InstanceObject):
+            if get("type") == "program":
+                self.programs[obj_id] = (attr.LayerIndex, programTopology.program_curves(get))
+                self._sequences.clear()
+            elif obj.InstanceDefinition is not None and obj.InstanceDefinition.Name == "Pose":
+                self.poses[obj_id] = attr.LayerIndex
+        elif isinstance(obj, Rhino.DocObjects.CurveObject):
+            if get(programTopology.TOPOLOGY_KEY) or get("UUID_0000"):
+                self.curves[obj_id] = programTopology.curve_topology(get)
+                self._sequences.clear()
+
+    def layer(self, layer_index):
+        return self.doc.Layers[layer_index].FullPath
+
+    def program_layer(self, prog_id):
+        return self.layer(self.programs[str(prog_id)][0])
+
+    def program_ids(self):
+        return list(self.programs)
+
+    def program_curves(self, prog_id):
+        entry = self.programs.get(str(prog_id))
+        return list(entry[1]) if entry else []
+
+    def curve_topology(self, crv_id):
+        return self.curves.get(str(crv_id), (-1, []))
+
+    def curve_poses(self, crv_id):
+        return list(self.curve_topology(crv_id)[1])
+
+    def _sequence(self, prog_id):
+        prog_id = str(prog_id)
+        seq = self._sequences.get(prog_id)
+        if seq is None:
+            # Les poses de transition (fin d'une courbe = début de la suivante) ne comptent qu'une fois
+            poses = []
+            for crv_id in self.program_curves(prog_id):
+                for p_uuid in self.curve_poses(crv_id):
+                    if poses and poses[-1] == p_uuid: continue
+                    poses.append(p_uuid)
+            seq = (poses, dict((p_uuid, row) for row, p_uuid in enumerate(poses)))
+            self._sequences[prog_id] = seq
+        return seq
+
+    def program_poses(self, prog_id):
+        """Poses du programme dans l'ordre, calculées une fois tant que la topologie ne change pas."""
+        return self._sequence(prog_id)[0]
+
+    def pose_row(self, prog_id, pose_id):
+        """Rang d'une pose dans le programme, ou None."""
+        return self._sequence(prog_id)[1].get(str(pose_id))
+
+    def exists(self, obj_id):
+        obj_id = str(obj_id)
+        return obj_id in self.curves or obj_id in self.poses or obj_id in self.programs
+
+    def programs_for(self, selected_ids):
+        """Programmes dont le calque est celui (ou le parent de celui) d'un élément sélectionné."""
+        target_layers = set()
+        for s_id in selected_ids:
+            obj = self.doc.Objects.FindId(System.Guid(str(s_id)))
+            if obj is None: continue
+            lyr = self.doc.Layers[obj.Attributes.LayerIndex]
+            target_layers.add(lyr.Index)
+            parent = self.doc.Layers.FindId(lyr.ParentLayerId)
+            if parent is not None: target_layers.add(parent.Index)
+        return [p for p, (layer_index, _) in self.programs.items() if layer_index in target_layers]
+
+def get_registry(doc=None):
+    """Registre du document, construit au premier appel puis maintenu par les événements."""
+    return docEvents.doc_cache(REGISTRY_KEY, ProgramRegistry, doc)
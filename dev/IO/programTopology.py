@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Topologie des programmes sérialisée sous une seule clé UserText, indépendante de Rhino.
+
+    bloc programme : topology = {"v": 1, "curves": [uuid courbe, ...]}
+    polyligne      : topology = {"v": 1, "first": n° de la 1re pose, "poses": [uuid pose, ...]}
+
+Les lecteurs acceptent encore l'ancien format (Crv_0000..., Pt_0000..., UUID_0000...).
+Nom et couleur des trajectoires sont partagés par l'import et le rebuild.
+'get' est une fonction clé -> valeur (rs.GetUserText, Attributes.GetUserString, dict.get).
+"""
+import json
+
+TOPOLOGY_KEY = "topology"
+TOPOLOGY_VERSION = 1
+LEGACY_PREFIXES = ("Crv_", "Pt_", "UUID_")
+
+ARCON_COLOR = (255, 0, 0)
+ARCOF_COLOR = (150, 150, 150)
+
+
+def _dumps(data):
+    data["v"] = TOPOLOGY_VERSION
+    return json.dumps(data, separators=(",", ":"))
+
+
+def encode_program(curve_uuids):
+    return _dumps({"curves": [str(u) for u in curve_uuids]})
+
+
+def encode_curve(first_row, pose_uuids):
+    return _dumps({"first": first_row, "poses": [str(u) for u in pose_uuids]})
+
+
+def _loads(blob):
+    if not blob: return None
+    try:
+        data = json.loads(blob)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("v", 0) > TOPOLOGY_VERSION: return None
+    return data
+
+
+def _legacy_values(get, prefix):
+    values = []
+    while True:
+        v = get("{}{:04d}".format(prefix, len(values)))
+        if not v: return values
+        values.append(v)
+
+
+def program_curves(get):
+    """uuids des courbes du programme, dans l'ordre."""
+    data = _loads(get(TOPOLOGY_KEY))
+    if data is not None: return data.get("curves", [])
+    return _legacy_values(get, "Crv_")
+
+
+def curve_topology(get):
+    """(n° de la première pose ou -1, uuids des poses de la courbe)."""
+    data = _loads(get(TOPOLOGY_KEY))
+    if data is not None: return data.get("first", -1), data.get("poses", [])
+    first = get("Pt_0000")
+    return (int(first) if first else -1), _legacy_values(get, "UUID_")
+
+
+def curve_poses(get):
+    return curve_topology(get)[1]
+
+
+def is_legacy_key(key):
+    return key.startswith(LEGACY_PREFIXES)
+
+
+def trajectory_name(start, end, state):
+    """Nom d'une trajectoire : ARCON_0005-0010 (state vrai = ARCON)."""
+    return "{}_{:04d}-{:04d}".format("ARCON" if state else "ARCOF", start, end)
+
+
+def trajectory_color(state):
+    return ARCON_COLOR if state else ARCOF_COLOR
+
+
+def set_topology(attr, blob):
+    """Écrit la topologie sur des ObjectAttributes et supprime les anciennes clés Crv_/Pt_/UUID_."""
+    for key in list(attr.GetUserStrings().AllKeys):
+        if is_legacy_key(key): attr.DeleteUserString(key)
+    attr.SetUserString(TOPOLOGY_KEY, blob)
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Moteur de reconstruction des programmes, indépendant de Rhino.
+
+Entrée : un ProgramData (courbes d'origine dans l'ordre Crv_, copies de
+courbes, poses existantes, copies de poses) et les choix Avant/Après.
+Sortie : un RebuildPlan (ordre final des poses, table, segments ARCON/ARCOF)
+limité à la zone modifiée : seules les poses dont le numéro change et les
+trajectoires dont le contenu change sont à retoucher.
+rebuildPrograms.py collecte les données dans le document et applique le plan.
+"""
+import math
+import sys
+import time
+from collections import namedtuple
+
+from poseTable import PoseTable, ARCON, ARCOF
+
+# Pose existante : point (x, y, z), état ARCON/ARCOF, nom actuel ("0012")
+PoseData = namedtuple("PoseData", "uuid point state name")
+# Trajectoire : origin = uuid_origin, pose_uuids = poses de la topologie, vertices = sommets
+# de la polyligne, first = numéro de sa première pose, state = ARCON/ARCOF
+CurveData = namedtuple("CurveData", "uuid origin pose_uuids vertices first state")
+# Pose à créer : copie de 'source' placée en 'point'
+NewPose = namedtuple("NewPose", "source point state")
+# order[i] = uuid existant ou NewPose, aligné sur les lignes de 'table'
+# dirty_rows : lignes à renommer / réinitialiser (uuid_origin)
+# curves[k] : uuid de la courbe conservée pour le segment k, ou None (à créer)
+# renumber_curves : segments conservés dont le numéro de première pose change
+# replace_curves : {segment k: uuid d'une courbe d'origine dont la géométrie est remplacée}
+RebuildPlan = namedtuple("RebuildPlan", "order table segments dirty_rows curves renumber_curves replace_curves obsolete_curves")
+
+CLOSED_TOLERANCE = 0.001
+
+
+class ProgramData(object):
+    def __init__(self, curves, curve_copies=None, poses=None, pose_copies=None):
+        self.curves = curves                    # [CurveData] d'origine, ordre Crv_
+        self.curve_copies = curve_copies or {}  # uuid courbe -> [CurveData] copies
+        self.poses = poses or {}                # uuid -> PoseData (originaux et copies)
+        self.pose_copies = pose_copies or {}    # uuid pose -> [uuid des copies]
+
+
+def order_curves(data, copies_before=False):
+    """Courbes d'origine et leurs copies, copies avant ou après chaque originale."""
+    ordered = []
+    for crv in data.curves:
+        copies = data.curve_copies.get(crv.uuid, [])
+        if copies_before:
+            ordered.extend(copies)
+            ordered.append(crv)
+        else:
+            ordered.append(crv)
+            ordered.extend(copies)
+    return ordered
+
+
+def _is_closed(pts):
+    return len(pts) > 1 and math.sqrt(sum((a - b) ** 2 for a, b in zip(pts[0], pts[-1]))) < CLOSED_TOLERANCE
+
+
+def linear_poses(data, ordered, crv_copies_before=False, pose_copies_before=False):
+    """Liste plate des poses (uuid existant ou NewPose) parcourant les courbes ordonnées."""
+    items = []
+    last_original = data.curves[-1].uuid if data.curves else None
+    is_copy_crv = False
+    for crv in ordered:
+        is_prev_copy_crv = is_copy_crv
+        is_copy_crv = crv.origin != crv.uuid
+
+        poses_in_curve = list(crv.pose_uuids)
+        if not poses_in_curve: continue
+        last = data.poses.get(poses_in_curve[-1])
+        last_state = last.state if last else None
+
+        if not is_copy_crv:
+            # CAS A : COURBE ORIGINALE
+            # Après une copie, on saute le premier point des courbes ARCOF (transition déjà présente)
+            if is_prev_copy_crv and last_state == ARCOF: poses_in_curve.pop(0)
+            for p_uuid in poses_in_curve:
+                if p_uuid not in data.poses: continue
+                copies = data.pose_copies.get(p_uuid, [])
+                if pose_copies_before:
+                    items.extend(copies)
+                    items.append(p_uuid)
+                else:
+                    items.append(p_uuid)
+                    items.extend(copies)
+        else:
+            # CAS B : COURBE COPIÉE (nouvelle trajectoire)
+            # Point de transition remplacé par celui de la copie
+            if not crv_copies_before and last_state == ARCOF:
+                if items and crv.origin != last_original: items.pop()
+            if crv_copies_before and last_state == ARCON:
+                if items: items.pop()
+
+            # Nouvelles poses sur les sommets (dernier ignoré si polyligne fermée)
+            pts = list(crv.vertices)
+            if _is_closed(pts): pts.pop()
+            for k in range(min(len(pts), len(poses_in_curve))):
+                src = data.poses.get(poses_in_curve[k])
+                if src is None: continue
+                state = ARCOF if last_state == ARCOF else src.state
+                items.append(NewPose(src.uuid, tuple(pts[k]), state))
+    return items
+
+
+def remove_duplicates(items):
+    """Compacte en place (un seul passage) les poses existantes répétées consécutivement."""
+    write = 0
+    prev = None
+    for p in items:
+        if p == prev and not isinstance(p, NewPose): continue
+        items[write] = p
+        write += 1
+        prev = p
+    del items[write:]
+    return items
+
+
+def build_table(data, items):
+    """Table des poses finales (uuid None pour les poses à créer) et ordre aligné."""
+    table = PoseTable()
+    order = []
+    for item in items:
+        if isinstance(item, NewPose):
+            table.append(item.point, state=item.state)
+        else:
+            pose = data.poses.get(item)
+            if pose is None: continue
+            table.append(pose.point, state=pose.state, uuid=item)
+        order.append(item)
+    return table, order
+
+
+def dirty_rows(data, table, order):
+    """Poses créées, copies, ou dont le numéro (nom) ne correspond plus à la ligne."""
+    copies = set(c for cs in data.pose_copies.values() for c in cs)
+    rows = []
+    for row, item in enumerate(order):
+        if isinstance(item, NewPose) or item in copies or data.poses[item].name != "{:04d}".format(row):
+            rows.append(row)
+    return rows
+
+
+def _same_vertices(vertices, points):
+    """Sommets de la courbe confondus avec les points des poses (sommets inconnus : vrai)."""
+    if not vertices: return True
+    if len(vertices) != len(points): return False
+    tol2 = CLOSED_TOLERANCE ** 2
+    for v, p in zip(vertices, points):
+        if (v[0] - p[0]) ** 2 + (v[1] - p[1]) ** 2 + (v[2] - p[2]) ** 2 >= tol2: return False
+    return True
+
+
+def match_curves(data, table, segments):
+    """
+    Associe chaque segment à une courbe d'origine de même contenu (mêmes poses, même état).
+    Si une pose a été déplacée (sommet de la courbe différent de son point), la courbe
+    est remplacée plutôt que conservée.
+    Un segment modifié reprend si possible la courbe d'origine qui commence (ou finit)
+    par la même pose dans le même état : sa géométrie est remplacée, son id conservé.
+    Renvoie (courbe par segment ou None, segments à renuméroter, remplacements, courbes obsolètes).
+    """
+    by_content = {}
+    for crv in data.curves:
+        by_content[(tuple(crv.pose_uuids), crv.state)] = crv
+    curves = []
+    renumber = []
+    replace = {}
+    kept = set()
+    for k, (start, end, state) in enumerate(segments):
+        uuids = table.uuid[start:end + 1]
+        crv = None if None in uuids else by_content.get((tuple(uuids), state))
+        if crv is None or crv.uuid in kept:
+            curves.append(None)
+            continue
+        kept.add(crv.uuid)
+        if not _same_vertices(crv.vertices, table.points(start, end)):
+            replace[k] = crv.uuid
+            curves.append(None)
+            continue
+        curves.append(crv.uuid)
+        if crv.first != start: renumber.append(k)
+
+    # Courbes d'origine non conservées, réutilisables par extrémité
+    by_end = {}
+    for crv in data.curves:
+        if crv.uuid in kept or not crv.pose_uuids: continue
+        by_end.setdefault((crv.pose_uuids[0], crv.state), crv.uuid)
+        by_end.setdefault((crv.pose_uuids[-1], crv.state), crv.uuid)
+    for k, (start, end, state) in enumerate(segments):
+        if curves[k] is not None or k in replace: continue
+        for p_uuid in (table.uuid[start], table.uuid[end]):
+            c_uuid = by_end.get((p_uuid, state))
+            if c_uuid is not None and c_uuid not in kept:
+                kept.add(c_uuid)
+                replace[k] = c_uuid
+                break
+
+    obsolete = [c.uuid for c in data.curves if c.uuid not in kept]
+    for crv in data.curves: obsolete.extend(c.uuid for c in data.curve_copies.get(crv.uuid, []))
+    return curves, renumber, replace, obsolete
+
+
+def plan_rebuild(data, crv_copies_before=False, pose_copies_before=False):
+    ordered = order_curves(data, crv_copies_before)
+    items = remove_duplicates(linear_poses(data, ordered, crv_copies_before, pose_copies_before))
+    table, order = build_table(data, items)
+    # État initial défini par le premier segment (p0 -> p1) donc l'état de p1
+    segments = [s for s in table.state_runs(lead=1) if s[1] > s[0]]
+    curves, renumber, replace, obsolete = match_curves(data, table, segments)
+    return RebuildPlan(order, table, segments, dirty_rows(data, table, order), curves, renumber, replace, obsolete)
+
+
+def synthetic_program(n_poses, poses_per_curve=20, copy_every=50):
+    """Programme factice (benchmark) : courbes alternées ARCON/ARCOF, quelques copies."""
+    poses = {}
+    curves = []
+    curve_copies = {}
+    pose_copies = {}
+    n_curves = max(1, n_poses // poses_per_curve)
+    prev_last = None
+    row = 0
+    for c in range(n_curves):
+        state = ARCON if c % 2 else ARCOF
+        uuids = [prev_last] if prev_last else []
+        first = row - 1 if prev_last else row
+        while len(uuids) < poses_per_curve + 1:
+            u = "p{}".format(row)
+            poses[u] = PoseData(u, (float(row), 0.0, 0.0), state, "{:04d}".format(row))
+            uuids.append(u)
+            row += 1
+        prev_last = uuids[-1]
+        crv = CurveData("c{}".format(c), "c{}".format(c), uuids, [poses[u].point for u in uuids], first, state)
+        curves.append(crv)
+        if c % copy_every == copy_every - 1:
+            curve_copies[crv.uuid] = [CurveData(crv.uuid + "_copy", crv.uuid, uuids,
+                                                [(x, 10.0, z) for x, y, z in crv.vertices], -1, state)]
+            u = uuids[1]
+            pose_copies[u] = [u + "_copy"]
+            poses[u + "_copy"] = PoseData(u + "_copy", poses[u].point, poses[u].state, "")
+    return ProgramData(curves, curve_copies, poses, pose_copies)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = synthetic_program(n)
+    t0 = time.time()
+    plan = plan_rebuild(data)
+    print("{} poses, {} segments en {:.3f} s".format(len(plan.table), len(plan.segments), time.time() - t0))
+    print("{} poses à renuméroter, {} courbes à créer, {} à remplacer, {} à renuméroter".format(
+        len(plan.dirty_rows), plan.curves.count(None) - len(plan.replace_curves), len(plan.replace_curves),
+        len(plan.renumber_curves)))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Affiche le source JBI d'un programme importé.
+Le texte n'est décompressé qu'à la demande, depuis la table de chaînes du document.
+"""
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import jbiSource
+from rebuildPrograms import get_program_from_selection
+
+def show_jbi_source():
+    selected = rs.GetObjects("Sélectionnez un élément du programme", preselect=True)
+    if not selected: return
+
+    programs = [s for s in selected if rs.GetUserText(s, "type") == "program"]
+    if not programs: programs = get_program_from_selection(selected)
+    if not programs:
+        print("Selection invalide: Selectionnez un element du programme.")
+        return
+
+    for prog_id in programs:
+        key = rs.GetUserText(prog_id, jbiSource.SOURCE_KEY)
+        payload = sc.doc.Strings.GetValue(jbiSource.SOURCE_SECTION, key) if key else None
+        if not payload:
+            print("Aucun source JBI stocké pour le programme {}.".format(rs.ObjectLayer(prog_id)))
+            continue
+        rs.TextOut(jbiSource.decompress_source(payload), key)
+
+if __name__ == "__main__":
+    show_jbi_source()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Lecture (jbiParser) puis réécriture (jbiWriter) d'un job JBI, hors Rhino."""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import jbiCache
+import jbiParser
+import jbiWriter
+from poseTable import PoseTable, ROBOT, USER
+
+JOB = """/JOB
+//NAME ROUNDTRIP
+//POS
+///NPOS 4,2,0,0,0,0
+///TOOL 1
+///POSTYPE ROBOT
+///RECTAN
+///RCONF 1,0,0,0,0,0,0,0
+C00000=100.000,0.000,50.000,180.0000,0.0000,0.0000
+C00001=110.000,0.000,50.000,180.0000,0.0000,0.0000
+///TOOL 1
+///USER 3
+///POSTYPE USER
+///RECTAN
+///RCONF 1,0,0,0,0,0,0,0
+C00002=10.000,20.000,0.000,180.0000,0.0000,90.0000
+C00003=15.000,20.000,0.000,180.0000,0.0000,90.0000
+///POSTYPE BASE
+///RECTAN
+BC00000=250.000
+BC00001=300.000
+//INST
+///DATE 2026/01/01 00:00
+///FOLDERNAME CELL1
+///ATTR SC,RW
+///GROUP1 RB1,BS1
+NOP
+MOVJ C00000 BC00000 VJ=50.00
+ARCON ASF#(3)
+MOVL C00001 BC00000 V=10.0 PL=0
+ARCON ASF#(4)
+MOVL C00002 BC00001 V=12.0 //soudure
+ARCOF AEF#(2)
+MOVL C00003 BC00001 V=100.0
+ARCOF AEF#(1)
+END
+"""
+DATE = "2026/01/01 00:00"
+
+
+def parse(text=JOB):
+    return jbiParser.parse_jbi(text.splitlines())
+
+
+def test_parse_positions_and_context():
+    program = parse()
+    positions = program.positions
+    assert program.job_name == "ROUNDTRIP"
+    assert program.folder_name == "CELL1"
+    assert list(positions.postype) == [ROBOT, ROBOT, USER, USER]
+    assert list(positions.user) == [0, 0, 3, 3]
+    assert list(positions.tool) == [1, 1, 1, 1]
+    assert positions.rconf == ["1,0,0,0,0,0,0,0"] * 4
+    assert positions.pose(2) == (10.0, 20.0, 0.0, 180.0, 0.0, 90.0)
+    bc_context = ("///POSTYPE BASE", "///RECTAN")
+    assert program.bc_positions == {0: ("250.000", bc_context), 1: ("300.000", bc_context)}
+    assert program.groups == ["///GROUP1 RB1,BS1"]
+    assert program.unsupported == []
+
+
+def test_parse_moves_and_arc_instructions():
+    moves = parse().moves
+    assert [mv.c_id for mv in moves] == ["C00000", "C00001", "C00002", "C00003"]
+    assert [mv.bc_id for mv in moves] == ["BC00000", "BC00000", "BC00001", "BC00001"]
+    assert [mv.arcon for mv in moves] == [False, True, True, False]
+    assert [mv.arc_cmd for mv in moves] == [None, "ARCON ASF#(3)", "ARCON ASF#(4)", "ARCOF AEF#(2)"]
+    assert moves[1].pl == "0"
+    assert moves[2].comment == "soudure"
+    assert parse().trailing_arc == "ARCOF AEF#(1)"
+
+
+def test_round_trip_is_identical():
+    lines = list(jbiWriter.iter_jbi_lines(parse(), DATE))
+    assert lines == JOB.splitlines()
+
+
+def test_write_file_uses_crlf(tmp_path):
+    path = str(tmp_path / "out.jbi")
+    jbiWriter.write_jbi(parse(), path, DATE)
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data == ("\r\n".join(JOB.splitlines()) + "\r\n").encode("utf-8")
+
+
+def test_missing_arc_instruction_is_refused(tmp_path):
+    program = parse()
+    program.moves = [mv._replace(arc_cmd=None) if mv.arcon else mv for mv in program.moves]
+    path = str(tmp_path / "out.jbi")
+    with pytest.raises(jbiWriter.JbiWriteError):
+        jbiWriter.write_jbi(program, path, DATE)
+    assert not os.path.exists(path)
+
+
+def test_copied_pose_reuses_arc_instruction():
+    program = parse()
+    # Pose copiée au rebuild : changement d'état sans instruction propre
+    program.moves[3] = program.moves[3]._replace(arc_cmd=None)
+    nop = list(jbiWriter.iter_jbi_lines(program, DATE))
+    assert nop[nop.index("MOVL C00003 BC00001 V=100.0") - 1] == "ARCOF AEF#(1)"
+
+
+def test_missing_rconf_is_refused():
+    program = parse()
+    program.positions.rconf[0] = None
+    with pytest.raises(jbiWriter.JbiWriteError):
+        list(jbiWriter.iter_jbi_lines(program, DATE))
+
+
+def test_unsupported_positions_are_reported():
+    program = parse(JOB.replace("///NPOS 4,2,0,0,0,0", "///NPOS 4,2,1,0,0,0"))
+    assert program.unsupported == ["EC"]
+
+
+def test_pose_table_pickle_keeps_context():
+    positions = parse().positions
+    restored = PoseTable()
+    restored.__setstate__(positions.__getstate__())
+    assert list(restored.postype) == list(positions.postype)
+    assert restored.rconf == positions.rconf
+    assert restored.row_of(3) == 3
+
+
+# Format des objets mis en cache : toute modification impose d'incrémenter PARSER_VERSION,
+# sinon jbiCache relirait d'anciens pickles sans les nouveaux champs.
+CACHE_SCHEMAS = {
+    3: (jbiParser.JbiMove._fields,
+        ("bc_positions", "folder_name", "groups", "job_name", "moves", "positions", "trailing_arc", "unsupported"),
+        PoseTable.COLUMNS + ("uuid", "rconf")),
+}
+
+
+def cache_schema():
+    return (jbiParser.JbiMove._fields,
+            tuple(sorted(vars(jbiParser.JbiProgram()))),
+            PoseTable.COLUMNS + tuple(k for k in ("uuid", "rconf") if k in PoseTable().__getstate__()))
+
+
+def test_parser_version_matches_cache_schema():
+    assert CACHE_SCHEMAS.get(jbiParser.PARSER_VERSION) == cache_schema(), \
+        "Format du JbiProgram modifié : incrémenter jbiParser.PARSER_VERSION"
+
+
+def test_cache_key_carries_parser_version(tmp_path):
+    src = tmp_path / "job.jbi"
+    src.write_text(JOB)
+    key = jbiCache.file_key(str(src))
+    assert key.endswith("_v{}".format(jbiParser.PARSER_VERSION))
+
+    cache_dir = str(tmp_path / "cache")
+    first = jbiCache.parse_jbi_file(str(src), cache_dir)
+    cached = jbiCache.parse_jbi_file(str(src), cache_dir)
+    assert os.listdir(cache_dir) == [key + jbiCache.EXTENSION]
+    assert list(jbiWriter.iter_jbi_lines(cached, DATE)) == list(jbiWriter.iter_jbi_lines(first, DATE))
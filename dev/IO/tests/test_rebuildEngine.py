@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Tests du moteur de rebuild (rebuildEngine), hors Rhino, sur des programmes synthétiques."""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import rebuildEngine
+from poseTable import ARCON, ARCOF
+from rebuildEngine import NewPose, plan_rebuild, remove_duplicates, synthetic_program
+
+
+def baseline_order(data, crv_copies_before, pose_copies_before):
+    """
+    Ordre des poses du rebuild d'origine (rebuildPrograms avant le moteur), transcrit
+    sur un ProgramData : mêmes sauts de poses de transition, même suppression des doublons.
+    """
+    ordered = []
+    for crv in data.curves:
+        copies = data.curve_copies.get(crv.uuid, [])
+        ordered.extend(copies + [crv] if crv_copies_before else [crv] + copies)
+    last_original = data.curves[-1].uuid
+    items = []
+    is_copy_crv = False
+    for crv in ordered:
+        is_prev_copy_crv = is_copy_crv
+        is_copy_crv = crv.origin != crv.uuid
+        poses_in_curve = list(crv.pose_uuids)
+        last_state = data.poses[poses_in_curve[-1]].state
+        if not is_copy_crv:
+            if is_prev_copy_crv and last_state == ARCOF: poses_in_curve.pop(0)
+            for p_uuid in poses_in_curve:
+                if p_uuid not in data.poses: continue
+                copies = data.pose_copies.get(p_uuid, [])
+                items.extend(copies + [p_uuid] if pose_copies_before else [p_uuid] + copies)
+        else:
+            if not crv_copies_before and last_state == ARCOF:
+                if items and crv.origin != last_original: items.pop()
+            if crv_copies_before and last_state == ARCON:
+                if items: items.pop()
+            pts = list(crv.vertices)
+            if len(pts) > 1 and sum((a - b) ** 2 for a, b in zip(pts[0], pts[-1])) < 0.001 ** 2: pts.pop()
+            for k in range(min(len(pts), len(poses_in_curve))):
+                src = data.poses[poses_in_curve[k]]
+                items.append(("new", src.uuid, tuple(pts[k]), ARCOF if last_state == ARCOF else src.state))
+    prev = None
+    for i, p in enumerate(items):
+        if p == prev and not isinstance(p, tuple): items.pop(i)
+        prev = p
+    return items
+
+
+def as_baseline(order):
+    return [("new", o.source, o.point, o.state) if isinstance(o, NewPose) else o for o in order]
+
+
+@pytest.mark.parametrize("crv_before", [False, True])
+@pytest.mark.parametrize("pose_before", [False, True])
+def test_order_matches_baseline(crv_before, pose_before):
+    data = synthetic_program(200, poses_per_curve=10, copy_every=3)
+    plan = plan_rebuild(data, crv_before, pose_before)
+    assert as_baseline(plan.order) == baseline_order(data, crv_before, pose_before)
+
+
+def test_unchanged_program_keeps_everything():
+    data = synthetic_program(100, poses_per_curve=10, copy_every=10 ** 6)
+    plan = plan_rebuild(data)
+    assert plan.curves == [c.uuid for c in data.curves]
+    assert plan.dirty_rows == []
+    assert plan.renumber_curves == []
+    assert plan.replace_curves == {}
+    assert plan.obsolete_curves == []
+
+
+def test_boundary_pose_appears_once():
+    # Deux courbes consécutives partagent leur pose de transition
+    data = synthetic_program(100, poses_per_curve=10, copy_every=10 ** 6)
+    plan = plan_rebuild(data)
+    assert len(plan.table) == len(data.poses)
+    assert len(set(plan.table.uuid)) == len(plan.table)
+    for (s0, e0, _), (s1, e1, _) in zip(plan.segments, plan.segments[1:]):
+        assert e0 == s1
+
+
+def test_removed_pose_replaces_and_renumbers():
+    data = synthetic_program(100, poses_per_curve=10, copy_every=10 ** 6)
+    del data.poses["p3"]
+    plan = plan_rebuild(data)
+    assert plan.curves[0] is None
+    assert plan.replace_curves == {0: "c0"}
+    assert plan.renumber_curves == list(range(1, len(data.curves)))
+    assert plan.dirty_rows == list(range(3, len(plan.table)))
+    assert plan.obsolete_curves == []
+
+
+def test_moved_pose_replaces_curve():
+    data = synthetic_program(100, poses_per_curve=10, copy_every=10 ** 6)
+    crv = data.curves[2]
+    data.curves[2] = crv._replace(vertices=[(x, y + 1.0, z) for x, y, z in crv.vertices])
+    plan = plan_rebuild(data)
+    assert plan.curves[2] is None
+    assert plan.replace_curves == {2: "c2"}
+    assert plan.renumber_curves == []
+
+
+def test_arcon_copy_inserts_new_poses():
+    data = synthetic_program(40, poses_per_curve=10, copy_every=2)
+    src = data.curves[1]
+    assert src.state == ARCON
+    plan = plan_rebuild(data)
+    start = plan.order.index(src.pose_uuids[-1]) + 1
+    new = plan.order[start:start + len(src.pose_uuids)]
+    assert all(isinstance(o, NewPose) for o in new)
+    assert [o.source for o in new] == src.pose_uuids
+    assert [o.point for o in new] == [(x, 10.0, z) for x, y, z in src.vertices]
+    # La première pose garde l'état ARCOF de la transition, les suivantes sont ARCON
+    assert [o.state for o in new] == [ARCOF] + [ARCON] * (len(new) - 1)
+    assert plan.obsolete_curves == ["c1_copy", "c3_copy"]
+
+
+def test_remove_duplicates_keeps_new_poses():
+    a = NewPose("p0", (0.0, 0.0, 0.0), ARCOF)
+    items = ["p0", "p0", "p0", "p1", a, a, "p1"]
+    assert remove_duplicates(items) == ["p0", "p1", a, a, "p1"]
+
+
+def test_closed_polyline_detection():
+    assert rebuildEngine._is_closed([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, 0.0)])
+    assert not rebuildEngine._is_closed([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0)])
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Empreinte géométrique d'un groupe d'objets, calculée dans le repère local de sa Pose.
+
+Deux groupes "Nom#1" et "Nom#2" issus d'un même bloc ont la même empreinte :
+nombre d'objets et, pour chaque objet, type, boîte englobante, volume (solides),
+hash des sommets et attributs d'affichage, arrondis à TOLERANCE près.
+La reconstruction s'en sert pour n'ajouter qu'une définition par empreinte.
+"""
+import hashlib
+
+try:
+    import Rhino.Geometry as rg
+except ImportError:
+    rg = None  # fonctions de hash utilisables hors Rhino
+
+TOLERANCE = 1e-3
+
+def quantize(value, tolerance=TOLERANCE):
+    return int(round(value / tolerance))
+
+def quantize_point(pt, tolerance=TOLERANCE):
+    return tuple(quantize(c, tolerance) for c in pt)
+
+def points_hash(points, tolerance=TOLERANCE):
+    """Hash indépendant de l'ordre des sommets."""
+    keys = sorted(quantize_point(p, tolerance) for p in points)
+    return hashlib.sha1(repr(keys).encode("utf-8")).hexdigest()[:16]
+
+def group_fingerprint(object_signatures):
+    """Empreinte d'un groupe : nombre d'objets + signatures triées."""
+    sigs = sorted(object_signatures)
+    payload = "{}\n{}".format(len(sigs), "\n".join(sigs))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def _xyz(pt):
+    return (pt.X, pt.Y, pt.Z)
+
+def geometry_points(geom):
+    """Sommets caractéristiques d'une géométrie RhinoCommon (déjà dans le repère local)."""
+    if isinstance(geom, rg.Extrusion): geom = geom.ToBrep()
+    if isinstance(geom, rg.Brep): return [_xyz(v.Location) for v in geom.Vertices]
+    if isinstance(geom, rg.Mesh): return [(v.X, v.Y, v.Z) for v in geom.Vertices]
+    if isinstance(geom, rg.Curve):
+        nurbs = geom.ToNurbsCurve()
+        if nurbs is not None: return [_xyz(p.Location) for p in nurbs.Points]
+    if isinstance(geom, rg.Point): return [_xyz(geom.Location)]
+    return []
+
+def geometry_signature(geom, attr, tolerance=TOLERANCE):
+    """Signature texte d'un objet : type, bbox, volume, sommets, calque, couleur, matériau."""
+    parts = [type(geom).__name__]
+    if isinstance(geom, rg.InstanceReferenceGeometry):
+        # Instance imbriquée : définition et repère local suffisent
+        xf = geom.Xform
+        parts.append(str(geom.ParentIdefId))
+        parts.append(repr([quantize(xf[r, c], tolerance) for r in range(3) for c in range(4)]))
+    else:
+        bbox = geom.GetBoundingBox(True)
+        parts.append(repr(quantize_point(_xyz(bbox.Min), tolerance) + quantize_point(_xyz(bbox.Max), tolerance)))
+        solid = geom.ToBrep() if isinstance(geom, rg.Extrusion) else geom
+        if isinstance(solid, (rg.Brep, rg.Mesh)) and solid.IsSolid:
+            vmp = rg.VolumeMassProperties.Compute(solid)
+            if vmp is not None: parts.append(str(quantize(vmp.Volume, tolerance)))
+        parts.append(points_hash(geometry_points(geom), tolerance))
+    parts.append("{}|{}|{}|{}".format(attr.LayerIndex, int(attr.ColorSource), attr.ObjectColor.ToArgb(), attr.MaterialIndex))
+    return ";".join(parts)
+
+def fingerprint_objects(rh_objects, inv_xform, tolerance=TOLERANCE):
+    """Empreinte d'objets du document ramenés dans le repère local (inv_xform)."""
+    sigs = []
+    for obj in rh_objects:
+        geom = obj.Geometry.Duplicate()
+        geom.Transform(inv_xform)
+        sigs.append(geometry_signature(geom, obj.Attributes, tolerance))
+    return group_fingerprint(sigs)
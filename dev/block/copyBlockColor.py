@@ -4,6 +4,11 @@ Version: 1.0
 Date: 09/01/26
 """
 import rhinoscriptsyntax as rs
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 def copyBlockColor():
     # 1. Sélections
@@ -52,34 +57,33 @@ def copyBlockColor():
     # ---------------------------------------------------------
     # ÉTAPE 2 : Appliquer aux blocs DESTINATION
     # ---------------------------------------------------------
-    rs.EnableRedraw(False) # Optimisation de vitesse
-    
-    for dst_name in dst_def_names:
-        dst_objects = rs.BlockObjects(dst_name)
-        
-        if not dst_objects:
-            continue
+    with CommandScope("Copie couleur bloc"):
+
+        for dst_name in dst_def_names:
+            dst_objects = rs.BlockObjects(dst_name)
+
+            if not dst_objects:
+                continue
+
+            # Boucle sur les objets de la destination
+            for i, dst_obj in enumerate(dst_objects):
+
+                # --- C'EST ICI QUE LA MAGIE OPÈRE (Boucle intelligente) ---
+                # Si destination a plus d'objets que source, on utilise le modulo (%)
+                # pour revenir au début de la liste source.
+                # Ex: si src_styles a 2 éléments, l'index 2 devient 0, l'index 3 devient 1, etc.
+                src_index = i % len(src_styles)
+
+                target_style = src_styles[src_index]
+
+                # Application des modifications
+                rs.ObjectColorSource(dst_obj, target_style['source'])
 
-        # Boucle sur les objets de la destination
-        for i, dst_obj in enumerate(dst_objects):
-            
-            # --- C'EST ICI QUE LA MAGIE OPÈRE (Boucle intelligente) ---
-            # Si destination a plus d'objets que source, on utilise le modulo (%)
-            # pour revenir au début de la liste source.
-            # Ex: si src_styles a 2 éléments, l'index 2 devient 0, l'index 3 devient 1, etc.
-            src_index = i % len(src_styles)
-            
-            target_style = src_styles[src_index]
-            
-            # Application des modifications
-            rs.ObjectColorSource(dst_obj, target_style['source'])
-            
-            # On applique la couleur seulement si la source n'est pas "By Layer" ou "By Parent" 
-            # (Bien que techniquement on peut l'appliquer tout le temps, c'est plus propre ainsi)
-            if target_style['source'] == 1: # 1 = Color from Object
-                rs.ObjectColor(dst_obj, target_style['color'])
+                # On applique la couleur seulement si la source n'est pas "By Layer" ou "By Parent" 
+                # (Bien que techniquement on peut l'appliquer tout le temps, c'est plus propre ainsi)
+                if target_style['source'] == 1: # 1 = Color from Object
+                    rs.ObjectColor(dst_obj, target_style['color'])
 
-    rs.EnableRedraw(True)
     print("Mise a jour terminee sur {} definitions de blocs.".format(len(dst_def_names)))
 
 if __name__ == "__main__": 
@@ -1,54 +1,101 @@
 # -*- coding: utf-8 -*-
 import rhinoscriptsyntax as rs
+import Rhino
+import Rhino.Geometry as rg
+import scriptcontext as sc
+import System
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hierarchyIndex import get_hierarchy_index, level_key
+from instanceCounter import reserve_indices
 
 def create_pose_block():
     """Crée le bloc 'Pose' (trièdre RVB) s'il n'existe pas."""
     if not rs.IsBlock("Pose"):
-        rs.EnableRedraw(False)
-        items = []
-        items.append(rs.AddLine([0,0,0], [1,0,0]))
-        rs.ObjectColor(items[-1], [255,0,0])
-        items.append(rs.AddLine([0,0,0], [0,1,0]))
-        rs.ObjectColor(items[-1], [0,255,0])
-        items.append(rs.AddLine([0,0,0], [0,0,1]))
-        rs.ObjectColor(items[-1], [0,0,255])
-        rs.AddBlock(items, [0,0,0], "Pose", True)
-        rs.EnableRedraw(True)
+        with CommandScope("Bloc Pose"):
+            items = []
+            items.append(rs.AddLine([0,0,0], [1,0,0]))
+            rs.ObjectColor(items[-1], [255,0,0])
+            items.append(rs.AddLine([0,0,0], [0,1,0]))
+            rs.ObjectColor(items[-1], [0,255,0])
+            items.append(rs.AddLine([0,0,0], [0,0,1]))
+            rs.ObjectColor(items[-1], [0,0,255])
+            rs.AddBlock(items, [0,0,0], "Pose", True)
     return "Pose"
 
-def get_next_instance_index(block_name):
-    """Trouve l'indice Y unique pour un block_name donné dans le document."""
-    max_index = 0
-    all_objs = rs.AllObjects()
-    for obj in all_objs:
-        keys = rs.GetUserText(obj)
-        if keys:
-            for key in keys:
-                if key.startswith("BlockNameLevel_"):
-                    value = rs.GetUserText(obj, key)
-                    if value and "#" in value:
-                        try:
-                            name_part, index_part = value.split("#")
-                            if name_part == block_name:
-                                idx = int(index_part)
-                                if idx > max_index: max_index = idx
-                        except: continue
-    return max_index + 1
+def reserve_instance_indices(object_ids):
+    """Réserve d'un coup une plage d'indices par nom de bloc : {nom: prochain indice}."""
+    counts = {}
+    for obj_id in object_ids:
+        if not rs.IsBlockInstance(obj_id): continue
+        name = rs.BlockInstanceName(obj_id)
+        if name != "Pose": counts[name] = counts.get(name, 0) + 1
+    return dict((name, reserve_indices(name, n)) for name, n in counts.items())
 
 def get_current_hierarchy_info(obj_id):
     """Récupère le niveau d'imbrication (X) et l'historique des UserTexts."""
-    keys = rs.GetUserText(obj_id)
-    max_level = -1
-    existing_data = {}
-    if keys:
-        for key in keys:
-            if key.startswith("BlockNameLevel_"):
-                try:
-                    lvl = int(key.split("_")[-1])
-                    if lvl > max_level: max_level = lvl
-                    existing_data[key] = rs.GetUserText(obj_id, key)
-                except: continue
-    return max_level + 1, existing_data
+    levels = get_hierarchy_index().levels(obj_id)
+    existing_data = dict((level_key(lvl), val) for lvl, val in levels.items())
+    return max(levels) + 1 if levels else 0, existing_data
+
+def definition_pieces(idef, cache):
+    """Géométrie et attributs des objets d'une définition, lus une seule fois par commande."""
+    pieces = cache.get(idef.Index)
+    if pieces is None:
+        pieces = [(o.Geometry, o.Attributes) for o in idef.GetObjects()]
+        cache[idef.Index] = pieces
+    return pieces
+
+def inherit_from_parent(attr, parent):
+    """Propriétés 'par parent' reprises de l'instance, comme lors d'une explosion Rhino."""
+    if attr.ColorSource == Rhino.DocObjects.ObjectColorSource.ColorFromParent:
+        attr.ColorSource = parent.ColorSource
+        attr.ObjectColor = parent.ObjectColor
+    if attr.MaterialSource == Rhino.DocObjects.ObjectMaterialSource.MaterialFromParent:
+        attr.MaterialSource = parent.MaterialSource
+        attr.MaterialIndex = parent.MaterialIndex
+    if attr.LinetypeSource == Rhino.DocObjects.ObjectLinetypeSource.LinetypeFromParent:
+        attr.LinetypeSource = parent.LinetypeSource
+        attr.LinetypeIndex = parent.LinetypeIndex
+
+def set_hierarchy(attr, history, new_key, new_value):
+    # 1. On recopie l'historique parent, 2. on ajoute le niveau actuel
+    for key, val in history.items(): attr.SetUserString(key, val)
+    attr.SetUserString(new_key, new_value)
+    return attr
+
+def explode_instance(inst, history, new_key, new_value, pose_index, cache):
+    """
+    Remplace l'instance par des copies transformées de la géométrie de sa définition
+    et par un bloc Pose, tous ajoutés avec leurs attributs complets (UserText compris).
+    """
+    table = sc.doc.Objects
+    xform = inst.InstanceXform
+    added = []
+    for geom, src_attr in definition_pieces(inst.InstanceDefinition, cache):
+        attr = src_attr.Duplicate()
+        attr.ObjectId = System.Guid.Empty
+        inherit_from_parent(attr, inst.Attributes)
+        set_hierarchy(attr, history, new_key, new_value)
+        if isinstance(geom, rg.InstanceReferenceGeometry):
+            # Bloc imbriqué : reste une instance, décomposable au niveau suivant
+            idef = sc.doc.InstanceDefinitions.FindId(geom.ParentIdefId)
+            added.append(table.AddInstanceObject(idef.Index, xform * geom.Xform, attr))
+        else:
+            piece = geom.Duplicate()
+            piece.Transform(xform)
+            added.append(table.Add(piece, attr))
+
+    # Bloc Pose (calque courant) au repère de l'instance
+    pose_attr = set_hierarchy(sc.doc.CreateDefaultAttributes(), history, new_key, new_value)
+    added.append(table.AddInstanceObject(pose_index, xform, pose_attr))
+    table.Delete(inst, True)
+    return added
 
 def decompose_reciproque():
     object_ids = rs.GetObjects("Sélectionnez les blocs à décomposer", preselect=True)
@@ -56,56 +103,40 @@ def decompose_reciproque():
 
     all_results = []
     create_pose_block()
-    rs.EnableRedraw(False)
-    
-    for obj_id in object_ids:
-        # --- CAS 1 : INSTANCE DE BLOC ---
-        if rs.IsBlockInstance(obj_id):
-            block_name = rs.BlockInstanceName(obj_id)
-            
-            # SECURITE : On ne décompose JAMAIS le bloc "Pose"
-            if block_name == "Pose":
-                all_results.append(obj_id)
-                continue
-
-            block_xform = rs.BlockInstanceXform(obj_id)
-            
-            # Récupération hiérarchie et calcul de l'indice unique
-            next_level, hierarchy_history = get_current_hierarchy_info(obj_id)
-            instance_index = get_next_instance_index(block_name)
-            
-            # Explosion
-            exploded_items = rs.ExplodeBlockInstance(obj_id)
-            if not exploded_items: exploded_items = []
-            
-            # Création et ajout du bloc Pose (lui reste intact)
-            pose_id = rs.InsertBlock("Pose", [0,0,0])
-            rs.TransformObject(pose_id, block_xform)
-            
-            # Liste complète des nouveaux objets à marquer
-            targets = list(exploded_items) + [pose_id]
-            
-            for item in targets:
-                # 1. On recopie l'historique parent
-                for key, val in hierarchy_history.items():
-                    rs.SetUserText(item, key, val)
-                
-                # 2. On ajoute le niveau actuel
-                new_key = "BlockNameLevel_{}".format(next_level)
+    with CommandScope("Décomposition réciproque", verbose=True):
+        next_indices = reserve_instance_indices(object_ids)
+        pose_index = sc.doc.InstanceDefinitions.Find("Pose").Index
+        pieces_cache = {}
+
+        for obj_id in object_ids:
+            # --- CAS 1 : INSTANCE DE BLOC ---
+            if rs.IsBlockInstance(obj_id):
+                block_name = rs.BlockInstanceName(obj_id)
+
+                # SECURITE : On ne décompose JAMAIS le bloc "Pose"
+                if block_name == "Pose":
+                    all_results.append(obj_id)
+                    continue
+
+                # Récupération hiérarchie et calcul de l'indice unique
+                next_level, hierarchy_history = get_current_hierarchy_info(obj_id)
+                instance_index = next_indices[block_name]
+                next_indices[block_name] += 1
+                new_key = level_key(next_level)
                 new_value = "{}#{}".format(block_name, instance_index)
-                rs.SetUserText(item, new_key, new_value)
-            
-            all_results.extend(targets)
 
-        # --- CAS 2 : GÉOMÉTRIE SIMPLE ---
-        else:
-            all_results.append(obj_id)
+                # Explosion depuis la géométrie de la définition (lue une fois par définition)
+                inst = sc.doc.Objects.FindId(obj_id)
+                all_results.extend(explode_instance(inst, hierarchy_history, new_key, new_value, pose_index, pieces_cache))
+
+            # --- CAS 2 : GÉOMÉTRIE SIMPLE ---
+            else:
+                all_results.append(obj_id)
+
+        rs.UnselectAllObjects()
+        if all_results:
+            rs.SelectObjects(all_results)
 
-    rs.UnselectAllObjects()
-    if all_results:
-        rs.SelectObjects(all_results)
-    
-    rs.EnableRedraw(True)
     print("Décomposition terminée : {} objets créés ou conservés.".format(len(all_results)))
 
 if __name__ == "__main__":
@@ -4,6 +4,11 @@ import Rhino.Geometry as rg
 import scriptcontext as sc
 import System.Drawing
 import re
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 def get_block_definition(block_name):
     if not rs.IsBlock(block_name):
@@ -97,15 +102,14 @@ def main():
             if new_val is not None: p_size = new_val
         elif res == "ResetScale": p_reset = "On" if p_reset == "Off" else "Off"
 
-    rs.EnableRedraw(False)
-    get_block_definition(block_name)
-    update_pose_geometry(block_name, p_type, p_size)
-    if p_reset == "On":
-        num = reset_instances_scale(block_name)
-        if num > 0: print("%d instances corrigées." % num)
-    
-    print(structure_requete % (p_type, p_size, p_reset))
-    rs.EnableRedraw(True)
+    with CommandScope("Définition Pose"):
+        get_block_definition(block_name)
+        update_pose_geometry(block_name, p_type, p_size)
+        if p_reset == "On":
+            num = reset_instances_scale(block_name)
+            if num > 0: print("%d instances corrigées." % num)
+
+        print(structure_requete % (p_type, p_size, p_reset))
 
 if __name__ == "__main__":
     main()
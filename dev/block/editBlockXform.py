@@ -8,6 +8,11 @@ import scriptcontext as sc
 import Rhino
 import rhinoscript.utility as rhutil
 import uuid 
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 
 # ----------------------------------------------------------------------
@@ -202,90 +207,89 @@ def editBlockXform():
         return 0
 
 
-    rs.EnableRedraw(False)
-    
-    # 3. Traitement par Définition
-    sel_per_def = {}
-    for sti in sel_tar_insts:
-        objref = rs.coercerhinoobject(sti)
-        idef = objref.InstanceDefinition
-        sel_per_def.setdefault(idef.Index, []).append(sti)
+    with CommandScope("Edition Xform bloc"):
+
+        # 3. Traitement par Définition
+        sel_per_def = {}
+        for sti in sel_tar_insts:
+            objref = rs.coercerhinoobject(sti)
+            idef = objref.InstanceDefinition
+            sel_per_def.setdefault(idef.Index, []).append(sti)
+
+
+        target_defs_to_process = {
+            idef_index: instances[-1]
+            for idef_index, instances in sel_per_def.items()
+        }
+
+
+        for idef_index, sti_for_calc in target_defs_to_process.items():
+            # print(('DEBUG: processing definition index', idef_index, 'using instance', sti_for_calc))
+
+            stiXform = rs.BlockInstanceXform(sti_for_calc) # T_cible_original
+            if stiXform is None: continue
+
+            # --- CALCUL DES TRANSFORMATIONS ---
+
+            # X_def = T_source^-1 * T_cible_original
+            inv_soiXform = rs.XformInverse(soiXform)
+            if inv_soiXform is None: continue
+            def_update = rs.XformMultiply(inv_soiXform, stiXform) # X_def
+
 
+            # X_comp = X_def^-1
+            inv_def = rs.XformInverse(def_update) # X_comp
+            if inv_def is None: continue
 
-    target_defs_to_process = {
-        idef_index: instances[-1]
-        for idef_index, instances in sel_per_def.items()
-    }
+            # 4. Modification de la Définition de la Cible (Def A)
+            ok = update_block_def(sti_for_calc, def_update)
+            if not ok: continue
 
+            # 5. Compensation Ascendante des Blocs Imbriqués
+            initial_block_name = rs.BlockInstanceName(sti_for_calc)
+            # print("DEBUG: Starting UPWARD propagation/compensation (SAFE METHOD) for nested blocks.")
+            PropagateUpwardCompensation(initial_block_name, inv_def) # inv_def est X_comp
+            # print("DEBUG: Upward propagation/compensation complete.")
 
-    for idef_index, sti_for_calc in target_defs_to_process.items():
-        # print(('DEBUG: processing definition index', idef_index, 'using instance', sti_for_calc))
-        
-        stiXform = rs.BlockInstanceXform(sti_for_calc) # T_cible_original
-        if stiXform is None: continue
-        
-        # --- CALCUL DES TRANSFORMATIONS ---
-        
-        # X_def = T_source^-1 * T_cible_original
-        inv_soiXform = rs.XformInverse(soiXform)
-        if inv_soiXform is None: continue
-        def_update = rs.XformMultiply(inv_soiXform, stiXform) # X_def
 
 
-        # X_comp = X_def^-1
-        inv_def = rs.XformInverse(def_update) # X_comp
-        if inv_def is None: continue
-        
-        # 4. Modification de la Définition de la Cible (Def A)
-        ok = update_block_def(sti_for_calc, def_update)
-        if not ok: continue
-        
-        # 5. Compensation Ascendante des Blocs Imbriqués
-        initial_block_name = rs.BlockInstanceName(sti_for_calc)
-        # print("DEBUG: Starting UPWARD propagation/compensation (SAFE METHOD) for nested blocks.")
-        PropagateUpwardCompensation(initial_block_name, inv_def) # inv_def est X_comp
-        # print("DEBUG: Upward propagation/compensation complete.")
 
+            # 6. Compensation des Instances Sœurs (et Cible)
+            blockName = rs.BlockInstanceName(sti_for_calc)
+            bro_tar_insts = rs.BlockInstances(blockName) or []
 
+            pre_xforms = {}
+            # Récupérer T_old pour toutes les instances (T_old n'est pas affecté par ModifyGeometry)
+            for bti in bro_tar_insts:
+                pre_xforms[bti] = rs.BlockInstanceXform(bti) 
 
+            for bti in bro_tar_insts:
+                T_old = pre_xforms.get(bti)
+                if T_old is None: continue
 
-        # 6. Compensation des Instances Sœurs (et Cible)
-        blockName = rs.BlockInstanceName(sti_for_calc)
-        bro_tar_insts = rs.BlockInstances(blockName) or []
-        
-        pre_xforms = {}
-        # Récupérer T_old pour toutes les instances (T_old n'est pas affecté par ModifyGeometry)
-        for bti in bro_tar_insts:
-            pre_xforms[bti] = rs.BlockInstanceXform(bti) 
-        
-        for bti in bro_tar_insts:
-            T_old = pre_xforms.get(bti)
-            if T_old is None: continue
 
+                if bti.Equals(sti_for_calc):
+                    # CIBLE : La transformation finale désirée est T_source
+                    desired_T = soiXform 
+                else:
+                    # SŒUR : La transformation finale désirée est T_new = X_comp * T_old
+                    desired_T = rs.XformMultiply(T_old, inv_def) 
 
-            if bti.Equals(sti_for_calc):
-                # CIBLE : La transformation finale désirée est T_source
-                desired_T = soiXform 
-            else:
-                # SŒUR : La transformation finale désirée est T_new = X_comp * T_old
-                desired_T = rs.XformMultiply(T_old, inv_def) 
-            
-            # Calcul X_apply : X_apply = desired_T * T_old^-1
-            inv_T_old = rs.XformInverse(T_old)
-            if inv_T_old is None: continue
+                # Calcul X_apply : X_apply = desired_T * T_old^-1
+                inv_T_old = rs.XformInverse(T_old)
+                if inv_T_old is None: continue
 
 
-            X_apply = rs.XformMultiply(desired_T, inv_T_old)
+                X_apply = rs.XformMultiply(desired_T, inv_T_old)
 
 
-            if not X_apply.IsIdentity:
-                # Appliquer X_apply à l'instance (False = transformation de l'objet)
-                rs.TransformObject(bti, X_apply, False)
+                if not X_apply.IsIdentity:
+                    # Appliquer X_apply à l'instance (False = transformation de l'objet)
+                    rs.TransformObject(bti, X_apply, False)
 
 
 
 
-    rs.EnableRedraw(True)
     return 1
 
 
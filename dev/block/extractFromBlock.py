@@ -1,6 +1,11 @@
 import rhinoscriptsyntax as rs
 import scriptcontext as sc
 import Rhino
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 def extractFromBlock():
     block = rs.GetObject("Select Block to extract objects from", rs.filter.instance, preselect=True)
@@ -16,11 +21,10 @@ def extractFromBlock():
     blockInstanceObjects = rs.TransformObjects(blockObjects, XformBlock, True)
     
     objs = rs.GetObjects("Select Objects to extract from Block", objects =blockInstanceObjects)
-    rs.EnableRedraw(False)
-    if objs:    
-        newObjs = rs.CopyObjects(objs, [0, 0, 0])
-        rs.SelectObjects(newObjs)
-    rs.DeleteObjects(blockInstanceObjects)
-    rs.EnableRedraw(True)
-   
+    with CommandScope("Extraction bloc"):
+        if objs:    
+            newObjs = rs.CopyObjects(objs, [0, 0, 0])
+            rs.SelectObjects(newObjs)
+        rs.DeleteObjects(blockInstanceObjects)
+
 extractFromBlock()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Index des UserText de hiérarchie (BlockNameLevel_X = "Nom#Y") du document.
+
+    (X, "Nom#Y") -> ids des objets de ce groupe
+    id           -> {X: "Nom#Y"}
+    "Nom"        -> indices Y utilisés (plus grand indice en O(1) amorti)
+
+Construit en un seul parcours de la table des objets puis tenu à jour par
+les événements RhinoDoc (utilities/docEvents.py) : décomposition,
+reconstruction et sélection hiérarchique n'ont plus à relire le UserText
+de tous les objets.
+"""
+import Rhino
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+import docEvents
+
+HIERARCHY_INDEX_KEY = "hierarchy_index"
+LEVEL_PREFIX = "BlockNameLevel_"
+
+def level_key(level):
+    return "{}{}".format(LEVEL_PREFIX, level)
+
+def split_signature(value):
+    """"Nom#Y" -> ("Nom", Y) ; indice None si la valeur n'est pas de cette forme."""
+    if not value or "#" not in value: return value, None
+    name, index = value.rsplit("#", 1)
+    try:
+        return name, int(index)
+    except ValueError:
+        return name, None
+
+def read_levels(attr):
+    """{X: "Nom#Y"} lus sur des ObjectAttributes."""
+    nvc = attr.GetUserStrings()
+    levels = {}
+    for key in nvc.AllKeys:
+        if not key.startswith(LEVEL_PREFIX): continue
+        try:
+            levels[int(key[len(LEVEL_PREFIX):])] = nvc.Get(key)
+        except ValueError:
+            continue
+    return levels
+
+class HierarchyIndex(object):
+    def __init__(self, doc):
+        self.entries = {}  # id -> {niveau: "Nom#Y"}
+        self.groups = {}   # (niveau, "Nom#Y") -> set(ids)
+        self.indices = {}  # "Nom" -> {Y: nombre d'occurrences}
+        self.max_indices = {}  # "Nom" -> plus grand Y (recalculé seulement quand il disparaît)
+
+        settings = Rhino.DocObjects.ObjectEnumeratorSettings()
+        settings.NormalObjects = True
+        settings.LockedObjects = True
+        settings.HiddenObjects = True
+        for obj in doc.Objects.GetObjectList(settings):
+            self.on_object(str(obj.Id), obj, obj.Attributes)
+
+    def on_object(self, obj_id, obj, attr):
+        """Met à jour l'entrée d'un objet (appelé par docEvents) ; obj None = supprimé."""
+        for level, value in self.entries.pop(obj_id, {}).items():
+            ids = self.groups.get((level, value))
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids: del self.groups[(level, value)]
+            name, index = split_signature(value)
+            counts = self.indices.get(name)
+            if index is None or counts is None or index not in counts: continue
+            counts[index] -= 1
+            if counts[index]: continue
+            del counts[index]
+            if not counts:
+                del self.indices[name]
+                del self.max_indices[name]
+            elif index == self.max_indices[name]:
+                self.max_indices[name] = max(counts)
+        if obj is None: return
+
+        levels = read_levels(attr)
+        if not levels: return
+        self.entries[obj_id] = levels
+        for level, value in levels.items():
+            self.groups.setdefault((level, value), set()).add(obj_id)
+            name, index = split_signature(value)
+            if index is None: continue
+            counts = self.indices.setdefault(name, {})
+            counts[index] = counts.get(index, 0) + 1
+            if index > self.max_indices.get(name, index - 1): self.max_indices[name] = index
+
+    def levels(self, obj_id):
+        """{X: "Nom#Y"} d'un objet (vide si hors hiérarchie)."""
+        return dict(self.entries.get(str(obj_id), {}))
+
+    def members(self, level, value):
+        """ids des objets portant BlockNameLevel_<level> = value."""
+        return list(self.groups.get((level, value), ()))
+
+    def level_of(self, value):
+        """Plus petit niveau où apparaît la valeur, ou None."""
+        found = [level for level, v in self.groups if v == value]
+        return min(found) if found else None
+
+    def max_index(self, name):
+        """Plus grand indice Y utilisé pour 'Nom' (0 si aucun)."""
+        return self.max_indices.get(name, 0)
+
+def get_hierarchy_index(doc=None):
+    return docEvents.doc_cache(HIERARCHY_INDEX_KEY, HierarchyIndex, doc)
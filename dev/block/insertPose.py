@@ -1,4 +1,9 @@
 import rhinoscriptsyntax as rs
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 def create_pose_block():
     """Vérifie l'existence du bloc 'Pose' ou le crée avec un trièdre RVB."""
@@ -6,23 +11,22 @@ def create_pose_block():
         return "Pose"
     
     # Empêcher le rafraîchissement pendant la création des composants
-    rs.EnableRedraw(False)
-    
-    # Création des axes du trièdre (1 unité de long)
-    origin = [0, 0, 0]
-    x_axis = rs.AddLine(origin, [1, 0, 0])
-    y_axis = rs.AddLine(origin, [0, 1, 0])
-    z_axis = rs.AddLine(origin, [0, 0, 1])
-    
-    # Attribution des couleurs RVB
-    rs.ObjectColor(x_axis, [255, 0, 0])
-    rs.ObjectColor(y_axis, [0, 255, 0])
-    rs.ObjectColor(z_axis, [0, 0, 255])
-    
-    # Définition du bloc et suppression des objets temporaires
-    rs.AddBlock([x_axis, y_axis, z_axis], origin, "Pose", True)
-    
-    rs.EnableRedraw(True)
+    with CommandScope("Bloc Pose"):
+
+        # Création des axes du trièdre (1 unité de long)
+        origin = [0, 0, 0]
+        x_axis = rs.AddLine(origin, [1, 0, 0])
+        y_axis = rs.AddLine(origin, [0, 1, 0])
+        z_axis = rs.AddLine(origin, [0, 0, 1])
+
+        # Attribution des couleurs RVB
+        rs.ObjectColor(x_axis, [255, 0, 0])
+        rs.ObjectColor(y_axis, [0, 255, 0])
+        rs.ObjectColor(z_axis, [0, 0, 255])
+
+        # Définition du bloc et suppression des objets temporaires
+        rs.AddBlock([x_axis, y_axis, z_axis], origin, "Pose", True)
+
     return "Pose"
 
 def main():
@@ -59,22 +63,21 @@ def main():
 
     # --- Insertion et Sélection ---
     if insertion_points:
-        rs.EnableRedraw(False)
-        
-        # On désélectionne tout pour ne garder que les nouveaux blocs à la fin
-        rs.UnselectAllObjects()
-        
-        new_instances = []
-        for pt in insertion_points:
-            new_id = rs.InsertBlock(block_name, pt)
-            if new_id:
-                new_instances.append(new_id)
-        
-        # Sélection finale des objets créés
-        if new_instances:
-            rs.SelectObjects(new_instances)
-            
-        rs.EnableRedraw(True)
+        with CommandScope("Insertion Pose"):
+
+            # On désélectionne tout pour ne garder que les nouveaux blocs à la fin
+            rs.UnselectAllObjects()
+
+            new_instances = []
+            for pt in insertion_points:
+                new_id = rs.InsertBlock(block_name, pt)
+                if new_id:
+                    new_instances.append(new_id)
+
+            # Sélection finale des objets créés
+            if new_instances:
+                rs.SelectObjects(new_instances)
+
         print("Opération terminée : {} instance(s) 'Pose' insérée(s).".format(len(new_instances)))
 
 if __name__ == "__main__":
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Compteur d'indices d'instance (Y de "Nom#Y") par nom de bloc.
+
+Le dernier indice attribué est stocké dans la table de chaînes du document
+(section COUNTER_SECTION) : il est sauvegardé avec le fichier et ne redescend
+jamais, un indice n'est donc pas réattribué après suppression d'objets.
+La valeur stockée est toujours comparée au plus grand Y présent dans le
+document (index de hiérarchie) : une instance ajoutée hors compteur (copie,
+import) ne peut pas recevoir un indice déjà utilisé.
+"""
+import scriptcontext as sc
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hierarchyIndex import get_hierarchy_index
+
+COUNTER_SECTION = "picksoul_instance_index"
+
+def last_index(block_name, doc=None):
+    """Dernier indice attribué pour block_name : max(valeur stockée, plus grand indice du document)."""
+    doc = doc or sc.doc
+    stored = doc.Strings.GetValue(COUNTER_SECTION, block_name)
+    return max(int(stored) if stored else 0, get_hierarchy_index(doc).max_index(block_name))
+
+def reserve_indices(block_name, count=1, doc=None):
+    """Réserve 'count' indices consécutifs et renvoie le premier."""
+    doc = doc or sc.doc
+    first = last_index(block_name, doc) + 1
+    doc.Strings.SetString(COUNTER_SECTION, block_name, str(first + count - 1))
+    return first
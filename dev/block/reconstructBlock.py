@@ -1,6 +1,18 @@
 # -*- coding: utf-8 -*-
 import rhinoscriptsyntax as rs
+import Rhino
+import scriptcontext as sc
+import System
 import uuid
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hierarchyIndex import get_hierarchy_index, level_key, LEVEL_PREFIX
+import blockFingerprint
 
 def get_bbox_center(obj_id):
     """Calcule le centre d'une BoundingBox pour l'origine manuelle."""
@@ -13,39 +25,90 @@ def get_bbox_center(obj_id):
 def ensure_pose_block():
     """S'assure que la définition du bloc 'Pose' existe."""
     if not rs.IsBlock("Pose"):
-        rs.EnableRedraw(False)
-        p1 = [0,0,0]
-        l1 = rs.AddLine(p1, [1,0,0]); rs.ObjectColor(l1, [255,0,0])
-        l2 = rs.AddLine(p1, [0,1,0]); rs.ObjectColor(l2, [0,255,0])
-        l3 = rs.AddLine(p1, [0,0,1]); rs.ObjectColor(l3, [0,0,255])
-        rs.AddBlock([l1, l2, l3], p1, "Pose", True)
-        rs.EnableRedraw(True)
+        with CommandScope("Bloc Pose"):
+            p1 = [0,0,0]
+            l1 = rs.AddLine(p1, [1,0,0]); rs.ObjectColor(l1, [255,0,0])
+            l2 = rs.AddLine(p1, [0,1,0]); rs.ObjectColor(l2, [0,255,0])
+            l3 = rs.AddLine(p1, [0,0,1]); rs.ObjectColor(l3, [0,0,255])
+            rs.AddBlock([l1, l2, l3], p1, "Pose", True)
     return "Pose"
 
+def add_to_group(mapping, signature, level, obj, is_pose):
+    if signature not in mapping:
+        mapping[signature] = {"level": level, "objects": [], "pose": None}
+    if is_pose: mapping[signature]["pose"] = obj
+    else: mapping[signature]["objects"].append(obj)
+
 def get_hierarchy_map(obj_ids):
+    """Groupes {signature: {level, objects, pose}} en un seul parcours de la sélection."""
+    index = get_hierarchy_index()
     mapping = {}
     for obj in obj_ids:
-        if not rs.IsObject(obj): continue
-        keys = rs.GetUserText(obj)
-        max_lvl = -1
-        signature = "Root"
-        if keys:
-            for k in keys:
-                if k.startswith("BlockNameLevel_"):
-                    try:
-                        lvl = int(k.split("_")[-1])
-                        if lvl > max_lvl:
-                            max_lvl = lvl
-                            signature = rs.GetUserText(obj, k)
-                    except: continue
-        if signature not in mapping:
-            mapping[signature] = {"level": max_lvl, "objects": [], "pose": None}
-        if rs.IsBlockInstance(obj) and rs.BlockInstanceName(obj) == "Pose":
-            mapping[signature]["pose"] = obj
-        else:
-            mapping[signature]["objects"].append(obj)
+        rh_obj = sc.doc.Objects.FindId(System.Guid(str(obj)))
+        if rh_obj is None: continue
+        levels = index.levels(obj)
+        max_lvl = max(levels) if levels else -1
+        signature = levels[max_lvl] if levels else "Root"
+        is_pose = isinstance(rh_obj, Rhino.DocObjects.InstanceObject) and rh_obj.InstanceDefinition.Name == "Pose"
+        add_to_group(mapping, signature, max_lvl, str(obj), is_pose)
     return mapping
 
+def level_buckets(mapping):
+    """{niveau: [signatures]} hors Root."""
+    buckets = {}
+    for sig, data in mapping.items():
+        if sig != "Root": buckets.setdefault(data["level"], []).append(sig)
+    return buckets
+
+def parent_signature(levels, current_lvl):
+    """Signature du groupe parent : valeur du plus bas niveau au-dessus de current_lvl."""
+    upper = [lvl for lvl in levels if lvl < current_lvl]
+    if not upper: return -1, "Root"
+    return max(upper), levels[max(upper)]
+
+def rename_signatures(index, selection, mapping, buckets, old_prefix, new_prefix):
+    """
+    Remplace le préfixe 'Nom#' dans les UserText de hiérarchie des objets sélectionnés
+    (groupes trouvés par l'index, sans balayage) et renomme les groupes en attente.
+    buckets[lvl] est la liste même parcourue par la boucle de reconstruction.
+    """
+    for lvl, val in [g for g in index.groups if g[1].startswith(old_prefix)]:
+        new_val = val.replace(old_prefix, new_prefix)
+        key = level_key(lvl)
+        for obj in index.members(lvl, val):
+            if obj in selection: rs.SetUserText(obj, key, new_val)
+        data = mapping.get(val)
+        if data is None or data["level"] != lvl: continue
+        del mapping[val]
+        if new_val in mapping:
+            # Fusion avec un groupe existant de même signature
+            mapping[new_val]["objects"].extend(data["objects"])
+            if mapping[new_val]["pose"] is None: mapping[new_val]["pose"] = data["pose"]
+            bucket = buckets.get(lvl, [])
+            if val in bucket: bucket.remove(val)
+        else:
+            mapping[new_val] = data
+            bucket = buckets.get(lvl, [])
+            if val in bucket: bucket[bucket.index(val)] = new_val
+
+def add_definition(name, rh_objects, inv_xform):
+    """
+    Crée la définition directement depuis des copies de géométrie ramenées dans le
+    repère de la Pose, sans objets temporaires dans le document.
+    """
+    geometries = []
+    attributes = []
+    for obj in rh_objects:
+        geom = obj.Geometry.Duplicate()
+        geom.Transform(inv_xform)
+        attr = obj.Attributes.Duplicate()
+        attr.ObjectId = System.Guid.Empty
+        for k in list(attr.GetUserStrings().AllKeys):
+            if k.startswith(LEVEL_PREFIX): attr.DeleteUserString(k)
+        geometries.append(geom)
+        attributes.append(attr)
+    return sc.doc.InstanceDefinitions.Add(name, "", Rhino.Geometry.Point3d.Origin, geometries, attributes)
+
 def clean_name(signature):
     name = signature.split("#")[0] if "#" in signature else signature
     if name.lower().endswith("_base"): name = name[:-5]
@@ -56,144 +119,143 @@ def rebuild_reciproque():
     initial_objs = rs.GetObjects("Sélectionnez les objets à reconstruire", preselect=True)
     if not initial_objs: return
 
-    rs.EnableRedraw(False)
-    ensure_pose_block()
-    current_selection = list(initial_objs)
-    
-    # --- VÉRIFICATION ORIGINES ---
-    h_map = get_hierarchy_map(current_selection)
-    missing = [sig for sig, d in h_map.items() if sig != "Root" and d["pose"] is None]
-    
-    if missing:
-        levels = [h_map[sig]["level"] for sig in missing]
-        low_lvl = max(levels)
-        objs_to_fix = [o for sig in missing if h_map[sig]["level"] == low_lvl for o in h_map[sig]["objects"]]
-        if set(current_selection) != set(objs_to_fix):
-            rs.UnselectAllObjects()
-            rs.SelectObjects(objs_to_fix)
-            rs.EnableRedraw(True)
-            print("Origine manquante au niveau {}.".format(low_lvl))
-            return
-        
-        rs.EnableRedraw(True)
-        for sig in missing:
-            ref_id = rs.GetObject("Origine pour {}. (Entrée = Monde)".format(sig))
-            xform = rs.BlockInstanceXform(ref_id) if rs.IsBlockInstance(ref_id) else rs.XformTranslation(get_bbox_center(ref_id)) if ref_id else rs.XformIdentity()
-            temp_pose = rs.InsertBlock("Pose", [0,0,0])
-            rs.TransformObject(temp_pose, xform)
-            ref_obj = h_map[sig]["objects"][0]
-            for k in rs.GetUserText(ref_obj):
-                if k.startswith("BlockNameLevel_"): rs.SetUserText(temp_pose, k, rs.GetUserText(ref_obj, k))
-            current_selection.append(temp_pose)
-        rs.EnableRedraw(False)
-
-    # --- RECONSTRUCTION ---
-    h_map = get_hierarchy_map(current_selection)
-    unique_levels = sorted([d["level"] for sig, d in h_map.items() if sig != "Root"], reverse=True)
-
-    for current_lvl in unique_levels:
-        current_map = get_hierarchy_map(current_selection)
-        
-        for sig, data in current_map.items():
-            if data["level"] != current_lvl or sig == "Root": continue
-            
-            pose_obj, geometries = data["pose"], data["objects"]
-            if not pose_obj or not geometries: continue
-
-            original_name = clean_name(sig)
-            target_name = original_name
-            xform = rs.BlockInstanceXform(pose_obj)
-            
-            skip_reconstruction = False
-            user_action = "Ecraser"
-
-            # --- BOUCLE DE VALIDATION DU NOM ---
-            while rs.IsBlock(target_name):
+    with CommandScope("Reconstruction réciproque", verbose=True) as scope:
+        ensure_pose_block()
+        index = get_hierarchy_index()
+        current_selection = set(str(o) for o in initial_objs)
+
+        # --- ARBRE DES SIGNATURES (un seul parcours) ---
+        scope.phase("arbre")
+        h_map = get_hierarchy_map(current_selection)
+        missing = [sig for sig, d in h_map.items() if sig != "Root" and d["pose"] is None]
+
+        # --- VÉRIFICATION ORIGINES ---
+        if missing:
+            levels = [h_map[sig]["level"] for sig in missing]
+            low_lvl = max(levels)
+            objs_to_fix = [o for sig in missing if h_map[sig]["level"] == low_lvl for o in h_map[sig]["objects"]]
+            if current_selection != set(objs_to_fix):
                 rs.UnselectAllObjects()
-                rs.SelectObjects(geometries)
-                rs.SelectObject(pose_obj)
-                
-                # Visualisation du bloc conflictuel
-                temp_compare = rs.InsertBlock(target_name, [0,0,0])
-                rs.TransformObject(temp_compare, xform)
-                rs.ObjectColor(temp_compare, [150, 150, 150]) # Gris
-                
-                rs.EnableRedraw(True)
-                msg = "Le bloc '{}' existe déjà. Souhaitez-vous l'écraser ?".format(target_name)
-                user_action = rs.GetString(msg, "Ecraser", ["Ecraser", "Renommer", "Conserver", "Annuler"])
-                rs.EnableRedraw(False)
-                rs.DeleteObject(temp_compare)
-                
-                if user_action == "Ecraser":
-                    rs.RenameBlock(target_name, "temp_" + str(uuid.uuid4())[:8])
-                    break # On sort de la boucle, le nom est libre
-                elif user_action == "Renommer":
-                    new_name = rs.StringBox("Nouveau nom :", target_name, "Renommer le bloc")
-                    if not new_name:
+                rs.SelectObjects(objs_to_fix)
+                print("Origine manquante au niveau {}.".format(low_lvl))
+                return
+
+            with scope.interactive():
+                for sig in missing:
+                    ref_id = rs.GetObject("Origine pour {}. (Entrée = Monde)".format(sig))
+                    xform = rs.BlockInstanceXform(ref_id) if rs.IsBlockInstance(ref_id) else rs.XformTranslation(get_bbox_center(ref_id)) if ref_id else rs.XformIdentity()
+                    temp_pose = rs.InsertBlock("Pose", [0,0,0])
+                    rs.TransformObject(temp_pose, xform)
+                    ref_levels = index.levels(h_map[sig]["objects"][0])
+                    for lvl, val in ref_levels.items(): rs.SetUserText(temp_pose, level_key(lvl), val)
+                    current_selection.add(str(temp_pose))
+                    h_map[sig]["pose"] = str(temp_pose)
+
+        # --- RECONSTRUCTION (du niveau le plus bas vers la racine) ---
+        scope.phase("reconstruction")
+        buckets = level_buckets(h_map)
+        # (nom, empreinte géométrique) -> bloc déjà reconstruit : les groupes identiques le partagent
+        shared_blocks = {}
+        while buckets:
+            current_lvl = max(buckets)
+            # Liste en attente partagée avec rename_signatures (renommage des groupes frères)
+            pending = buckets[current_lvl]
+            while pending:
+                sig = pending.pop(0)
+                data = h_map.pop(sig, None)
+                if data is None: continue
+
+                pose_obj, geometries = data["pose"], data["objects"]
+                if not pose_obj or not geometries: continue
+
+                original_name = clean_name(sig)
+                target_name = original_name
+                xform = rs.BlockInstanceXform(pose_obj)
+                inv_xform = rs.XformInverse(xform)
+
+                skip_reconstruction = False
+                user_action = "Ecraser"
+                backup_name = None
+
+                # --- DÉFINITION PARTAGÉE (même géométrie dans le repère de la Pose) ---
+                rh_geos = [sc.doc.Objects.FindId(System.Guid(g)) for g in geometries]
+                fingerprint = (original_name, blockFingerprint.fingerprint_objects(rh_geos, inv_xform))
+                if fingerprint in shared_blocks:
+                    target_name = shared_blocks[fingerprint]
+                    skip_reconstruction = True
+
+                # --- BOUCLE DE VALIDATION DU NOM ---
+                while not skip_reconstruction and rs.IsBlock(target_name):
+                    rs.UnselectAllObjects()
+                    rs.SelectObjects(geometries)
+                    rs.SelectObject(pose_obj)
+
+                    # Visualisation du bloc conflictuel
+                    temp_compare = rs.InsertBlock(target_name, [0,0,0])
+                    rs.TransformObject(temp_compare, xform)
+                    rs.ObjectColor(temp_compare, [150, 150, 150]) # Gris
+
+                    with scope.interactive():
+                        msg = "Le bloc '{}' existe déjà. Souhaitez-vous l'écraser ?".format(target_name)
+                        user_action = rs.GetString(msg, "Ecraser", ["Ecraser", "Renommer", "Conserver", "Annuler"])
+                    rs.DeleteObject(temp_compare)
+
+                    if user_action == "Ecraser":
+                        backup_name = "temp_" + str(uuid.uuid4())[:8]
+                        rs.RenameBlock(target_name, backup_name)
+                        break # On sort de la boucle, le nom est libre
+                    elif user_action == "Renommer":
+                        new_name = rs.StringBox("Nouveau nom :", target_name, "Renommer le bloc")
+                        if not new_name:
+                            user_action = "Annuler"
+                            break
+                        target_name = new_name
+                        # La boucle continue pour vérifier si le NOUVEAU nom existe aussi
+                    elif user_action == "Conserver":
+                        skip_reconstruction = True
+                        break
+                    else: # Annuler ou Echap
                         user_action = "Annuler"
                         break
-                    target_name = new_name
-                    # La boucle continue pour vérifier si le NOUVEAU nom existe aussi
-                elif user_action == "Conserver":
-                    skip_reconstruction = True
-                    break
-                else: # Annuler ou Echap
-                    user_action = "Annuler"
-                    break
-            
-            if user_action == "Annuler": continue
-
-            # --- MISE À JOUR DES SIGNATURES (si le nom a changé) ---
-            if target_name != original_name:
-                old_prefix = original_name + "#"
-                new_prefix = target_name + "#"
-                for obj in current_selection:
-                    keys = rs.GetUserText(obj)
-                    if keys:
-                        for k in keys:
-                            if k.startswith("BlockNameLevel_"):
-                                val = rs.GetUserText(obj, k)
-                                if val and val.startswith(old_prefix):
-                                    rs.SetUserText(obj, k, val.replace(old_prefix, new_prefix))
-
-            # --- RECONSTRUCTION GÉOMÉTRIQUE ---
-            if not skip_reconstruction:
-                inv_xform = rs.XformInverse(xform)
-                copied_geos = []
-                for g in geometries:
-                    cp = rs.CopyObject(g)
-                    rs.TransformObject(cp, inv_xform)
-                    keys = rs.GetUserText(cp)
-                    if keys:
-                        for k in keys:
-                            if k.startswith("BlockNameLevel_"): rs.SetUserText(cp, k, None)
-                    copied_geos.append(cp)
-                
-                rs.AddBlock(copied_geos, [0,0,0], target_name, delete_input=True)
-
-            # Insertion nouvelle instance
-            new_inst = rs.InsertBlock(target_name, [0,0,0])
-            rs.TransformObject(new_inst, xform)
-            
-            # Transmission UserText parent
-            sample_obj = geometries[0]
-            all_keys = rs.GetUserText(sample_obj)
-            if all_keys:
-                for k in all_keys:
-                    if k.startswith("BlockNameLevel_"):
-                        lvl_idx = int(k.split("_")[-1])
-                        if lvl_idx < current_lvl:
-                            rs.SetUserText(new_inst, k, rs.GetUserText(sample_obj, k))
-
-            # Nettoyage
-            rs.DeleteObjects(geometries)
-            rs.DeleteObject(pose_obj)
-            
-            current_selection = [obj for obj in current_selection if obj not in geometries and obj != pose_obj]
-            current_selection.append(new_inst)
-
-    rs.EnableRedraw(True)
-    if current_selection: rs.SelectObjects(current_selection)
+
+                if user_action == "Annuler": continue
+
+                # --- RECONSTRUCTION GÉOMÉTRIQUE ---
+                # En cas d'échec, le groupe est laissé intact (géométries et Pose conservées)
+                if not skip_reconstruction and add_definition(target_name, rh_geos, inv_xform) < 0:
+                    print("Echec de création du bloc '{}' : groupe {} ignoré.".format(target_name, sig))
+                    if backup_name: rs.RenameBlock(backup_name, target_name)
+                    continue
+                shared_blocks.setdefault(fingerprint, target_name)
+
+                # --- MISE À JOUR DES SIGNATURES (si le nom a changé) ---
+                if target_name != original_name:
+                    rename_signatures(index, current_selection, h_map, buckets, original_name + "#", target_name + "#")
+
+                # Insertion nouvelle instance avec le UserText parent
+                sample_levels = index.levels(geometries[0])
+                inst_attr = sc.doc.CreateDefaultAttributes()
+                for lvl, val in sample_levels.items():
+                    if lvl < current_lvl: inst_attr.SetUserString(level_key(lvl), val)
+                idef_index = sc.doc.InstanceDefinitions.Find(target_name).Index
+                new_inst = str(sc.doc.Objects.AddInstanceObject(idef_index, xform, inst_attr))
+
+                # Nettoyage
+                rs.DeleteObjects(geometries)
+                rs.DeleteObject(pose_obj)
+
+                current_selection.difference_update(geometries)
+                current_selection.discard(pose_obj)
+                current_selection.add(new_inst)
+
+                # La nouvelle instance rejoint le groupe parent (traité à un niveau supérieur)
+                parent_lvl, parent_sig = parent_signature(sample_levels, current_lvl)
+                if parent_sig != "Root" and parent_sig not in h_map:
+                    buckets.setdefault(parent_lvl, []).append(parent_sig)
+                add_to_group(h_map, parent_sig, parent_lvl, new_inst, False)
+            del buckets[current_lvl]
+
+    if current_selection: rs.SelectObjects(list(current_selection))
     print("Terminé.")
 
 if __name__ == "__main__":
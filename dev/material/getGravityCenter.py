@@ -11,6 +11,11 @@ import rhinoscriptsyntax as rs
 import scriptcontext as sc
 import Rhino
 import math
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 KEY_NAME = "VolumicMass"
 
@@ -105,10 +110,9 @@ def main():
     scale_to_meter = get_doc_unit_scale_to_meter()
     identity = Rhino.Geometry.Transform.Identity
 
-    rs.EnableRedraw(False)
-    for guid in ids:
-        calculate_moments_recursive(guid, identity, data, scale_to_meter)
-    rs.EnableRedraw(True)
+    with CommandScope("Calcul centre de gravité", undo=False):
+        for guid in ids:
+            calculate_moments_recursive(guid, identity, data, scale_to_meter)
 
     total_mass = data[0]
 
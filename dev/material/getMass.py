@@ -11,6 +11,11 @@ import rhinoscriptsyntax as rs
 import scriptcontext as sc
 import Rhino
 import math
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 KEY_NAME = "VolumicMass"
 
@@ -138,14 +143,13 @@ def main():
     scale_to_meter = get_doc_unit_scale_to_meter()
     
     print("Calcul en cours...")
-    rs.EnableRedraw(False)
-    
-    identity = Rhino.Geometry.Transform.Identity
-    
-    for guid in ids:
-        calculate_mass_recursive(guid, identity, stats, scale_to_meter)
-        
-    rs.EnableRedraw(True)
+    with CommandScope("Calcul masse", undo=False):
+
+        identity = Rhino.Geometry.Transform.Identity
+
+        for guid in ids:
+            calculate_mass_recursive(guid, identity, stats, scale_to_meter)
+
 
     if not stats:
         rs.MessageBox("Aucun objet valide avec un matériau défini n'a été trouvé.", 48)
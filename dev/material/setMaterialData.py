@@ -7,6 +7,11 @@ Date: 22/12/25
 import rhinoscriptsyntax as rs
 import scriptcontext as sc
 import Rhino
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
 
 def get_first_material_by_name(name):
     """
@@ -74,39 +79,42 @@ def main():
         return
 
     KEY_NAME = "VolumicMass"
-    
-    # Parcourir chaque nom unique trouve
-    for mat_name in names_dict:
-        # Trouver la premiere occurrence reelle dans la base Rhino
-        target_mat = get_first_material_by_name(mat_name)
-        
-        if not target_mat:
-            continue
-            
-        sources_list = names_dict[mat_name]
-        
-        # Recuperation de la valeur existante sur cette occurrence
-        current_val = target_mat.GetUserString(KEY_NAME)
-        display_val = current_val if current_val else "Non definie"
-        
-        sources_str = "\n- ".join(sources_list)
-        prompt_msg = "Materiau : {}\nOrigines :\n- {}\n\nMasse volumique : {} kg/m3\nNouvelle valeur :".format(mat_name, sources_str, display_val)
-        
-        new_val_str = rs.StringBox(prompt_msg, default_value=current_val or "", title="Masse Volumique")
-
-        if new_val_str is None: continue
-        if str(new_val_str).strip() == "": continue
-
-        try:
-            val_float = float(new_val_str)
-            
-            # Mise a jour de la PREMIERE occurrence trouvee
-            target_mat.SetUserString(KEY_NAME, str(val_float))
-            target_mat.CommitChanges()
-            
-            print("Succes : Materiau '{}' mis a jour ({} kg/m3)".format(mat_name, val_float))
-        except ValueError:
-            rs.MessageBox("Nombre invalide.", 48)
+
+    with CommandScope("Masse volumique") as scope:
+        # Parcourir chaque nom unique trouve
+        for mat_name in names_dict:
+            # Trouver la premiere occurrence reelle dans la base Rhino
+            target_mat = get_first_material_by_name(mat_name)
+
+            if not target_mat:
+                continue
+
+            sources_list = names_dict[mat_name]
+
+            # Recuperation de la valeur existante sur cette occurrence
+            current_val = target_mat.GetUserString(KEY_NAME)
+            display_val = current_val if current_val else "Non definie"
+
+            sources_str = "\n- ".join(sources_list)
+            prompt_msg = "Materiau : {}\nOrigines :\n- {}\n\nMasse volumique : {} kg/m3\nNouvelle valeur :".format(mat_name, sources_str, display_val)
+
+            with scope.interactive():
+                new_val_str = rs.StringBox(prompt_msg, default_value=current_val or "", title="Masse Volumique")
+
+            if new_val_str is None: continue
+            if str(new_val_str).strip() == "": continue
+
+            try:
+                val_float = float(new_val_str)
+
+                # Mise a jour de la PREMIERE occurrence trouvee
+                target_mat.SetUserString(KEY_NAME, str(val_float))
+                target_mat.CommitChanges()
+
+                print("Succes : Materiau '{}' mis a jour ({} kg/m3)".format(mat_name, val_float))
+            except ValueError:
+                with scope.interactive():
+                    rs.MessageBox("Nombre invalide.", 48)
 
     rs.MessageBox("Mise a jour terminee.", 64)
 
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Index des noms d'objets par calque pour la navigation selectNext / selectPrev.
+
+    (calque, nom)        -> ids      poses nommées "0004"...
+    (calque, n° début)   -> ids      courbes nommées "... X-Y"
+    (calque, n° fin)     -> ids
+
+Construit en un parcours du document puis tenu à jour par les événements
+RhinoDoc (utilities/docEvents.py) : chaque pas de navigation est une recherche
+dans un dictionnaire. Les calques sont repérés par index.
+"""
+import Rhino
+import re
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+import docEvents
+
+NAME_INDEX_KEY = "name_index"
+RANGE_PATTERN = re.compile(r"(\d+)-(\d+)$")
+
+class NameIndex(object):
+    def __init__(self, doc):
+        self.entries = {}   # id -> (index calque, nom, (début, fin) ou None)
+        self.by_name = {}   # (index calque, nom) -> set(ids)
+        self.by_start = {}  # (index calque, début) -> set(ids)
+        self.by_end = {}    # (index calque, fin) -> set(ids)
+
+        settings = Rhino.DocObjects.ObjectEnumeratorSettings()
+        settings.NormalObjects = True
+        settings.LockedObjects = True
+        settings.HiddenObjects = True
+        for obj in doc.Objects.GetObjectList(settings):
+            self.on_object(str(obj.Id), obj, obj.Attributes)
+
+    def on_object(self, obj_id, obj, attr):
+        """Met à jour l'entrée d'un objet (appelé par docEvents) ; obj None = supprimé."""
+        old = self.entries.pop(obj_id, None)
+        if old is not None:
+            lyr, name, span = old
+            self._discard(self.by_name, (lyr, name), obj_id)
+            if span:
+                self._discard(self.by_start, (lyr, span[0]), obj_id)
+                self._discard(self.by_end, (lyr, span[1]), obj_id)
+        if obj is None or not attr.Name: return
+
+        lyr, name = attr.LayerIndex, attr.Name
+        match = None if name.isdigit() else RANGE_PATTERN.search(name)
+        span = (int(match.group(1)), int(match.group(2))) if match else None
+        self.entries[obj_id] = (lyr, name, span)
+        self.by_name.setdefault((lyr, name), set()).add(obj_id)
+        if span:
+            self.by_start.setdefault((lyr, span[0]), set()).add(obj_id)
+            self.by_end.setdefault((lyr, span[1]), set()).add(obj_id)
+
+    @staticmethod
+    def _discard(table, key, obj_id):
+        ids = table.get(key)
+        if ids is None: return
+        ids.discard(obj_id)
+        if not ids: del table[key]
+
+    def neighbours(self, obj_id, step):
+        """
+        Voisins d'un objet sur son calque : pose n° +/- step, ou courbes qui
+        commencent à sa fin (step > 0) / finissent à son début (step < 0).
+        """
+        obj_id = str(obj_id)
+        entry = self.entries.get(obj_id)
+        if entry is None: return []
+        lyr, name, span = entry
+        if name.isdigit():
+            return list(self.by_name.get((lyr, "{:04d}".format(int(name) + step)), ()))
+        if span is None: return []
+        if step > 0: ids = self.by_start.get((lyr, span[1]), ())
+        else: ids = self.by_end.get((lyr, span[0]), ())
+        return [c for c in ids if self.entries[c][1] != name]
+
+def get_name_index(doc=None):
+    return docEvents.doc_cache(NAME_INDEX_KEY, NameIndex, doc)
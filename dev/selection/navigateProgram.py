@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Navigation dans les poses d'un programme depuis la sélection :
+Pas (+/- N poses), Rang (saut à un numéro), Plage [a, b], Lecture (pas à pas, Échap pour arrêter).
+"""
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "IO"))
+from programRegistry import get_registry
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import programNavigation
+
+def navigate_program():
+    selected = rs.GetObjects("Sélectionnez une pose du programme", preselect=True)
+    if not selected: return
+
+    registry = get_registry()
+    located = programNavigation.locate_poses(selected, registry)
+    if not located:
+        print("Selection invalide: Selectionnez une pose du programme.")
+        return
+
+    step = sc.sticky.get("picksoul_nav_step", 1)
+    mode = rs.GetString("Navigation ({} programme(s))".format(len(located)), "Pas", ["Pas", "Rang", "Plage", "Lecture"])
+    if not mode: return
+
+    # Saisie unique, bornée par le plus long programme ; chaque programme ramène ensuite les rangs dans ses limites
+    max_count = max(len(registry.program_poses(p)) for p in located)
+    all_rows = [r for rows in located.values() for r in rows]
+    if mode == "Pas":
+        n = rs.GetInteger("Nombre de poses (négatif pour reculer)", step)
+        if n is None: return
+        sc.sticky["picksoul_nav_step"] = n
+    elif mode == "Rang":
+        start = end = rs.GetInteger("Rang de la pose (0 - {})".format(max_count - 1), min(all_rows), 0, max_count - 1)
+        if start is None: return
+    elif mode == "Plage":
+        start = rs.GetInteger("Premier rang", min(all_rows), 0, max_count - 1)
+        if start is None: return
+        end = rs.GetInteger("Dernier rang", max(max(all_rows), start), 0, max_count - 1)
+        if end is None: return
+    elif mode == "Lecture":
+        end = rs.GetInteger("Lecture jusqu'au rang (Échap pour arrêter)", max_count - 1, 0, max_count - 1)
+        if end is None: return
+
+    result = []
+    for prog_id, rows in located.items():
+        poses = registry.program_poses(prog_id)
+        if mode == "Pas":
+            result.extend(programNavigation.step_poses(prog_id, [poses[r] for r in rows], n, registry))
+        elif mode in ("Rang", "Plage"):
+            result.extend(programNavigation.pose_range(prog_id, start, end, registry))
+        elif mode == "Lecture":
+            last = programNavigation.play(prog_id, rows[0], end, registry=registry)
+            if last is not None: result.append(poses[last])
+
+    programNavigation.select_poses(result)
+    print("{} pose(s) sélectionnée(s).".format(len(result)))
+
+if __name__ == "__main__":
+    navigate_program()
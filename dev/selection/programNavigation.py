@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Navigation dans les poses d'un programme : pas de N, saut à un rang, plage, lecture.
+
+La séquence ordonnée des poses est lue dans le registre des programmes
+(IO/programRegistry.py), calculée une fois puis conservée tant que la
+topologie ne change pas : chaque déplacement est un accès par rang.
+"""
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+import Rhino
+import time
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "IO"))
+from programRegistry import get_registry
+
+PLAY_INTERVAL = 0.1
+
+def clamp_row(row, count):
+    return max(0, min(row, count - 1))
+
+def locate_poses(selected_ids, registry=None):
+    """{id programme: [rangs des poses sélectionnées]} pour les poses de la sélection."""
+    registry = registry or get_registry()
+    found = {}
+    for prog_id in registry.programs_for(selected_ids):
+        rows = [registry.pose_row(prog_id, s) for s in selected_ids]
+        rows = [r for r in rows if r is not None]
+        if rows: found[prog_id] = rows
+    return found
+
+def step_poses(prog_id, pose_ids, step, registry=None):
+    """Poses situées 'step' rangs après (ou avant si négatif) chaque pose donnée ; hors limites ignorées."""
+    registry = registry or get_registry()
+    poses = registry.program_poses(prog_id)
+    result = []
+    for p_uuid in pose_ids:
+        row = registry.pose_row(prog_id, p_uuid)
+        if row is None: continue
+        target = row + step
+        if 0 <= target < len(poses): result.append(poses[target])
+    return result
+
+def pose_range(prog_id, start, end, registry=None):
+    """Poses des rangs start à end inclus (bornes ramenées dans le programme)."""
+    registry = registry or get_registry()
+    poses = registry.program_poses(prog_id)
+    if not poses: return []
+    start, end = sorted((clamp_row(start, len(poses)), clamp_row(end, len(poses))))
+    return poses[start:end + 1]
+
+def select_poses(pose_ids):
+    rs.UnselectAllObjects()
+    if pose_ids: rs.SelectObjects(pose_ids)
+    return pose_ids
+
+def play(prog_id, start=0, end=None, interval=PLAY_INTERVAL, registry=None):
+    """Sélectionne les poses une à une de start à end (Échap pour arrêter) ; renvoie le dernier rang."""
+    registry = registry or get_registry()
+    poses = registry.program_poses(prog_id)
+    if not poses: return None
+    end = len(poses) - 1 if end is None else clamp_row(end, len(poses))
+    row = clamp_row(start, len(poses))
+    step = 1 if end >= row else -1
+    while True:
+        select_poses([poses[row]])
+        sc.doc.Views.Redraw()
+        Rhino.RhinoApp.Wait()
+        if row == end or sc.escape_test(False): break
+        time.sleep(interval)
+        row += step
+    return row
@@ -1,23 +1,23 @@
 # -*- coding: utf-8 -*-
 import rhinoscriptsyntax as rs
 import scriptcontext as sc
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utilities"))
+from commandScope import CommandScope
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "block"))
+from hierarchyIndex import get_hierarchy_index
 
 def get_hierarchy_data(obj_id):
-    """Extrait les niveaux {X: "Nom#Y"} d'un objet."""
-    keys = rs.GetUserText(obj_id)
-    data = {}
-    if not keys: return data
-    for key in keys:
-        if key.startswith("BlockNameLevel_"):
-            try:
-                lvl = int(key.split("_")[-1])
-                data[lvl] = rs.GetUserText(obj_id, key)
-            except: continue
-    return data
+    """Extrait les niveaux {X: "Nom#Y"} d'un objet (index de hiérarchie)."""
+    return get_hierarchy_index().levels(obj_id)
 
 def main():
     selected = rs.SelectedObjects()
-    
+    index = get_hierarchy_index()
+
     # Historique de la session (sticky) pour le mode manuel
     last_val = sc.sticky.get("last_hierarchy_value")
     last_lvl = sc.sticky.get("last_hierarchy_level")
@@ -40,23 +40,15 @@ def main():
         # --- LOGIQUE DE CONTINUATION (TODO corrigé) ---
         # On parcours tous les niveaux du plus bas au plus haut pour trouver l'état actuel
         current_detected_level = None
-        all_objs = rs.AllObjects() # Pour compter les représentants dans le document
-        
+        selected_set = set(str(s) for s in selected)
+
         # Inversion pour parcourir du plus bas au plus haut
         for lvl in reversed(levels):
             val = hierarchy[lvl]
-            key_str = "BlockNameLevel_{}".format(lvl)
-            
-            # Compter combien d'objets dans le document ont cette valeur
-            objs_in_doc = [o for o in all_objs if rs.GetUserText(o, key_str) == val]
-            
-            # Vérifier si TOUS ces objets sont présents dans la sélection actuelle
-            all_contained = True
-            for o_doc in objs_in_doc:
-                if o_doc not in selected:
-                    all_contained = False
-                    break
-            
+
+            # Objets du document ayant cette valeur (index) : tous présents dans la sélection ?
+            all_contained = all(o_doc in selected_set for o_doc in index.members(lvl, val))
+
             if all_contained:
                 current_detected_level = lvl
             else:
@@ -99,33 +91,20 @@ def main():
             target_level = last_lvl
         elif "#" in user_input:
             target_value = user_input
-            for obj in rs.AllObjects():
-                data = get_hierarchy_data(obj)
-                for l, v in data.items():
-                    if v == target_value:
-                        target_level = l
-                        break
-                if target_level is not None: break
+            target_level = index.level_of(target_value)
         else:
             print("Format invalide.")
             return
 
     # --- EXÉCUTION DE LA SÉLECTION ---
     if target_value and target_level is not None:
-        all_objs = rs.AllObjects()
-        to_select = []
-        key_str = "BlockNameLevel_{}".format(target_level)
-        
-        for obj in all_objs:
-            if rs.GetUserText(obj, key_str) == target_value:
-                to_select.append(obj)
-        
+        to_select = index.members(target_level, target_value)
+
         if to_select:
-            rs.EnableRedraw(False)
-            rs.UnselectAllObjects()
-            rs.SelectObjects(to_select)
-            rs.EnableRedraw(True)
-            
+            with CommandScope("Sélection hiérarchie", undo=False):
+                rs.UnselectAllObjects()
+                rs.SelectObjects(to_select)
+
             # Mise à jour de l'historique
             sc.sticky["last_hierarchy_value"] = target_value
             sc.sticky["last_hierarchy_level"] = target_level
@@ -4,26 +4,18 @@ Version: 1.0
 Date: 08/01/26
 """
 import rhinoscriptsyntax as rs
-import re
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "IO"))
+from programRegistry import get_registry
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import programNavigation
 
 def get_program_from_selection(selected_ids):
-    """Retrouve les programmes liés aux éléments sélectionnés"""
-    target_layers = set()
-    for s_id in selected_ids:
-        lyr = rs.ObjectLayer(s_id)
-        if lyr:
-            target_layers.add(lyr)
-            parent = rs.ParentLayer(lyr)
-            if parent: target_layers.add(parent)
-    
-    all_objs = rs.ObjectsByType(4096) # Instances de blocs
-    programs = []
-    if all_objs:
-        for obj in all_objs:
-            if rs.GetUserText(obj, "type") == "program":
-                if rs.ObjectLayer(obj) in target_layers:
-                    programs.append(obj)
-    return list(set(programs))
+    """Retrouve les programmes liés aux éléments sélectionnés (registre, sans balayage)"""
+    return get_registry().programs_for(selected_ids)
 
 
 def select_next_program_element():
@@ -51,6 +43,7 @@ def select_next_program_element():
     # print(pose_selected, curve_selected)
     
     print("Analyse de la selection utilisateur ({} objets)...".format(len(selected)))
+    registry = get_registry()
     target_programs = get_program_from_selection(selected)
     if not target_programs:
         print("ERREUR: Aucun programme associe a la selection.")
@@ -59,19 +52,15 @@ def select_next_program_element():
     next_curves = []
     next_poses = []
     for prog_id in target_programs:
-        prog_layer = rs.ObjectLayer(prog_id)
+        prog_layer = registry.program_layer(prog_id)
         print("\n>>> TRAITEMENT PROGRAMME: {}".format(prog_layer))
     
         # --- Identification des courbes via UserStrings ---
         original_crv_uuids = []
         select_next_curve = False
-        i = 0
-        while True:
-            # Attention: Utilisation stricte du formatage Crv_0000
-            key = "Crv_{:04d}".format(i)
-            u = rs.GetUserText(prog_id, key)
-            if not u: break
-            if rs.IsObject(u):
+        # Topologie lue dans le registre (tenu à jour par les événements du document)
+        for u in registry.program_curves(prog_id):
+            if registry.exists(u):
                 original_crv_uuids.append(u)
             else:
                 print("DEBUG: Courbe referencee {} introuvable (supprimee?).".format(u))
@@ -83,30 +72,10 @@ def select_next_program_element():
                 curve_selected.remove(u)
             if  not len(pose_selected) and not len(curve_selected) and not select_next_curve:
                 break
-            i += 1
         
 
-        # --- Identification des poses via UserStrings ---
-        last_pose = None
-        select_next_pose = False
-        for curve_uuid in original_crv_uuids:
-            p_idx = 0
-            while True:
-                orig_pose_uuid = rs.GetUserText(curve_uuid, "UUID_{:04d}".format(p_idx))
-                if not orig_pose_uuid: break                   
-                p_idx += 1
-                if orig_pose_uuid == last_pose:
-                    continue
-                last_pose = orig_pose_uuid
-                # print(orig_pose_uuid)
-                if select_next_pose:
-                    select_next_pose = False
-                    next_poses.append(orig_pose_uuid)
-                if orig_pose_uuid in pose_selected:
-                    select_next_pose = True
-                    pose_selected.remove(orig_pose_uuid)
-                if  not len(pose_selected) and not len(curve_selected) and not select_next_pose:
-                    break
+        # --- Identification des poses : séquence ordonnée du programme (en cache) ---
+        next_poses.extend(programNavigation.step_poses(prog_id, pose_selected, 1, registry))
     next_objects_to_select = next_curves + next_poses
     
     if next_objects_to_select:
@@ -4,7 +4,11 @@ Version: 1.0
 Date: 05/01/26
 """
 import rhinoscriptsyntax as rs
-import re
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from nameIndex import get_name_index
 
 def select_previous_elements():
     # Récupérer les objets actuellement sélectionnés
@@ -18,40 +22,12 @@ def select_previous_elements():
     
     rs.UnselectAllObjects()
 
+    # Index (calque, nom) tenu à jour par les événements du document
+    index = get_name_index()
     for obj_id in selected_objects:
-        obj_name = rs.ObjectName(obj_id)
-        obj_layer = rs.ObjectLayer(obj_id)
-        
-        if not obj_name:
-            continue
-
-        # --- CAS 1 : POSE (Nommé "3", "4"...) ---
-        if obj_name.isdigit():
-            target_idx = "{:04d}".format(int(obj_name) - 1)
-            target_name = str(target_idx)
-            
-            layer_objs = rs.ObjectsByLayer(obj_layer)
-            if layer_objs:
-                for cand_id in layer_objs:
-                    if rs.ObjectName(cand_id) == target_name:
-                        prev_objects_to_select.append(cand_id)
-
-        # --- CAS 2 : COURBE (Nommé "... X-Y") ---
-        else:
-            match = re.search(r"(\d+)-(\d+)$", obj_name)
-            if match:
-                current_start = int(match.group(1))
-                
-                layer_objs = rs.ObjectsByLayer(obj_layer)
-                if layer_objs:
-                    for cand_id in layer_objs:
-                        cand_name = rs.ObjectName(cand_id)
-                        if cand_name and cand_name != obj_name:
-                            cand_match = re.search(r"(\d+)-(\d+)$", cand_name)
-                            if cand_match:
-                                # La fin du précédent doit être le début de l'actuel
-                                if int(cand_match.group(2)) == current_start:
-                                    prev_objects_to_select.append(cand_id)
+        # CAS 1 : POSE (Nommé "0004") -> "0003"
+        # CAS 2 : COURBE (Nommé "... X-Y") -> la fin du précédent est le début de l'actuel
+        prev_objects_to_select.extend(index.neighbours(obj_id, -1))
 
     if prev_objects_to_select:
         rs.SelectObjects(prev_objects_to_select)
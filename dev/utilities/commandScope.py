@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Portée commune des commandes Picksoul : un seul enregistrement d'annulation,
+affichage suspendu, chronométrage par phase ; tout est restauré même en cas d'erreur.
+
+    with CommandScope("Rebuild JBI", verbose=True) as scope:
+        scope.phase("Lecture")
+        ...
+        with scope.interactive():   # affichage réactivé pour une ListBox
+            res = rs.ListBox(...)
+
+ou en décorateur : @command_scope("Import JBI")
+Les portées imbriquées réutilisent l'enregistrement et l'état d'affichage de la portée englobante.
+verbose=True (commandes longues : import, rebuild...) affiche les temps par phase.
+"""
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+import functools
+import time
+
+_active = []
+
+class CommandScope(object):
+    def __init__(self, name, undo=True, verbose=False):
+        self.name = name
+        self.undo = undo
+        self.verbose = verbose
+        self.phases = []
+        self._undo_sn = None
+        self._phase = None
+        self._t0 = None
+
+    def __enter__(self):
+        self._t0 = time.time()
+        outer = bool(_active)
+        _active.append(self)
+        if self.undo and not outer and not sc.doc.UndoRecordingIsActive:
+            self._undo_sn = sc.doc.BeginUndoRecord(self.name)
+        if not outer: rs.EnableRedraw(False)
+        return self
+
+    def phase(self, label):
+        """Clôt la phase en cours et en démarre une nouvelle."""
+        self._close_phase()
+        self._phase = (label, time.time())
+
+    def _close_phase(self):
+        if self._phase is None: return
+        label, t = self._phase
+        self.phases.append((label, time.time() - t))
+        self._phase = None
+
+    def interactive(self):
+        """Réactive l'affichage le temps d'une saisie utilisateur (ListBox, GetObject...)."""
+        return _Interactive()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._close_phase()
+        _active.remove(self)
+        try:
+            if self._undo_sn is not None: sc.doc.EndUndoRecord(self._undo_sn)
+        finally:
+            if not _active:
+                rs.EnableRedraw(True)
+                sc.doc.Views.Redraw()
+        if self.verbose and (self.phases or exc_type is None):
+            detail = ", ".join("{} {:.3f} s".format(label, t) for label, t in self.phases)
+            print("{} : {:.3f} s{}".format(self.name, time.time() - self._t0, " (" + detail + ")" if detail else ""))
+        return False
+
+class _Interactive(object):
+    def __enter__(self):
+        rs.EnableRedraw(True)
+        sc.doc.Views.Redraw()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        rs.EnableRedraw(False)
+        return False
+
+def command_scope(name, undo=True, verbose=False):
+    """Décorateur : exécute la commande dans une CommandScope."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with CommandScope(name, undo, verbose):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
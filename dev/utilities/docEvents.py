@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Caches par document tenus à jour par les événements RhinoDoc.
+
+Un cache est construit une seule fois par document (doc_cache) puis reçoit chaque
+ajout, suppression, remplacement ou modification d'attributs via sa méthode
+on_object(obj_id, obj, attr) ; obj et attr valent None pour un objet supprimé.
+Caches et gestionnaires vivent dans sc.sticky : ils survivent aux exécutions
+successives des scripts et les gestionnaires ne sont abonnés qu'une fois.
+Les caches d'un document sont libérés à sa fermeture.
+"""
+import Rhino
+import scriptcontext as sc
+
+STICKY_CACHES = "picksoul_doc_caches"
+STICKY_INSTALLED = "picksoul_doc_events"
+
+def _caches():
+    return sc.sticky.setdefault(STICKY_CACHES, {})
+
+def doc_cache(key, build, doc=None):
+    """Cache 'key' du document, construit par build(doc) au premier appel."""
+    doc = doc or sc.doc
+    _install()
+    caches = _caches()
+    cache_key = (doc.RuntimeSerialNumber, key)
+    cache = caches.get(cache_key)
+    if cache is None:
+        cache = build(doc)
+        caches[cache_key] = cache
+    return cache
+
+def invalidate(key=None, doc=None):
+    """Oublie un cache (ou tous les caches) du document : reconstruit au prochain appel."""
+    serial = (doc or sc.doc).RuntimeSerialNumber
+    caches = _caches()
+    for cache_key in list(caches):
+        if cache_key[0] == serial and (key is None or cache_key[1] == key): del caches[cache_key]
+
+def _notify(doc, obj_id, obj, attr):
+    if doc is None: return
+    serial = doc.RuntimeSerialNumber
+    for cache_key, cache in list(_caches().items()):
+        if cache_key[0] != serial: continue
+        try:
+            cache.on_object(str(obj_id), obj, attr)
+        except Exception as e:
+            # Un cache en erreur est abandonné plutôt que laissé incohérent
+            print("docEvents : cache {} invalidé ({})".format(cache_key[1], e))
+            _caches().pop(cache_key, None)
+
+def _on_add(sender, e):
+    obj = e.TheObject
+    _notify(obj.Document, obj.Id, obj, obj.Attributes)
+
+def _on_delete(sender, e):
+    obj = e.TheObject
+    _notify(obj.Document, obj.Id, None, None)
+
+def _on_replace(sender, e):
+    obj = e.NewRhinoObject
+    _notify(e.Document, e.ObjectId, obj, obj.Attributes)
+
+def _on_modify_attributes(sender, e):
+    _notify(e.Document, e.RhinoObject.Id, e.RhinoObject, e.NewAttributes)
+
+def _on_close(sender, e):
+    invalidate(doc=e.Document)
+
+def _install():
+    if sc.sticky.get(STICKY_INSTALLED): return
+    Rhino.RhinoDoc.AddRhinoObject += _on_add
+    Rhino.RhinoDoc.UndeleteRhinoObject += _on_add
+    Rhino.RhinoDoc.DeleteRhinoObject += _on_delete
+    Rhino.RhinoDoc.ReplaceRhinoObject += _on_replace
+    Rhino.RhinoDoc.ModifyObjectAttributes += _on_modify_attributes
+    Rhino.RhinoDoc.CloseDocument += _on_close
+    sc.sticky[STICKY_INSTALLED] = True